@@ -38,6 +38,18 @@ else:
     print(f"Superuser '{username}' already exists.")
 EOF
 
-python manage.py rqworker default &
-
-exec gunicorn core.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+# Shared by gunicorn and the RQ workers for Prometheus metrics (core/metrics.py);
+# emptied on start so counters from a previous run do not add up.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# One autoscaling worker pool per kind of work (RQ_WORKER_POOLS in core/settings.py),
+# see videoflix/management/commands/rqsupervisor.py
+python manage.py rqsupervisor --pool mail &
+python manage.py rqsupervisor --pool light &
+python manage.py rqsupervisor --pool transcode-high &
+python manage.py rqsupervisor --pool transcode-bulk &
+
+# Worker class, worker and thread counts come from gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py
\ No newline at end of file
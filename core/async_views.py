@@ -0,0 +1,56 @@
+"""
+Async support for DRF views.
+
+DRF's `APIView.dispatch` is synchronous. `AsyncAPIView` runs the same request
+cycle as a coroutine: request parsing, exception handling and response
+finalization are unchanged, authentication, permission and throttle checks
+(which may query the database) run through `sync_to_async`, and `async def`
+handlers are awaited. Under ASGI a view waiting on I/O or on the password
+hashing pool (see `core.hashing`) no longer occupies a worker.
+
+Classes:
+    AsyncAPIView: APIView base class for `async def` handlers.
+"""
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers (`post`, `get`, ...) are coroutines.
+
+    Handlers must not touch the ORM synchronously; use the async ORM API
+    (`aget`, `asave`, ...) or `sync_to_async`. Like every APIView it is exempt
+    from CSRF checks.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Run the DRF request cycle, awaiting the handler.
+
+        Returns:
+            Response: The finalized response.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if hasattr(response, '__await__'):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
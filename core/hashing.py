@@ -0,0 +1,110 @@
+"""
+Password hashing off the request path.
+
+PBKDF2 with several hundred thousand iterations takes hundreds of
+milliseconds of CPU. Async views hand it to a dedicated, bounded thread pool
+(`PASSWORD_HASHING_MAX_WORKERS` threads) instead of running it on the event
+loop or a request thread, so hashing concurrency is capped independently of
+request concurrency. hashlib releases the GIL while hashing, so the threads
+run in parallel with request handling.
+
+Only pure hashing runs in the pool; database access stays with the caller.
+
+Functions:
+    get_hashing_executor: Return the process-wide hashing thread pool.
+    run_in_hashing_pool: Await a function call on the hashing pool.
+    acheck_password: Check a user's password, upgrading the stored hash if needed.
+    amake_password: Hash a password.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hashing_executor() -> ThreadPoolExecutor:
+    """
+    Return the process-wide hashing thread pool, creating it on first use.
+
+    Returns:
+        ThreadPoolExecutor: Pool with `PASSWORD_HASHING_MAX_WORKERS` threads.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASHING_MAX_WORKERS,
+                    thread_name_prefix='password-hashing',
+                )
+    return _executor
+
+
+async def run_in_hashing_pool(func, *args, **kwargs):
+    """
+    Run a CPU-bound function on the hashing pool and await its result.
+
+    Args:
+        func (callable): The function to run; must not access the database.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        The return value of `func`.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hashing_executor(), partial(func, *args, **kwargs))
+
+
+def _needs_rehash(encoded: str) -> bool:
+    """
+    Return True if a valid hash was made with outdated hasher settings.
+    """
+    preferred = get_hasher('default')
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+async def acheck_password(user, raw_password: str) -> bool:
+    """
+    Check a password against a user's stored hash on the hashing pool.
+
+    Like `User.check_password`, a correct password stored with outdated
+    hasher settings is re-hashed and saved.
+
+    Args:
+        user (User): The user whose password is checked.
+        raw_password (str): The password to check.
+
+    Returns:
+        bool: True if the password is correct.
+    """
+    encoded = user.password
+    valid = await run_in_hashing_pool(check_password, raw_password, encoded)
+    if valid and _needs_rehash(encoded):
+        user.password = await amake_password(raw_password)
+        await user.asave(update_fields=['password'])
+    return valid
+
+
+async def amake_password(raw_password: str) -> str:
+    """
+    Hash a password on the hashing pool.
+
+    Args:
+        raw_password (str): The password to hash.
+
+    Returns:
+        str: The encoded hash, as produced by `make_password`.
+    """
+    return await run_in_hashing_pool(make_password, raw_password)
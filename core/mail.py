@@ -0,0 +1,286 @@
+"""
+Asynchronous email delivery.
+
+Views do not talk to the mail server. `queue_mail` stores a JSON description of
+the message in a Redis list and makes sure a delivery job is queued; the job
+renders and sends everything in the outbox in batches of MAIL_BATCH_SIZE over
+one SMTP connection. Jobs run on the `mail` queue, which has a worker pool of
+its own with non-forking workers (`core.metrics.MetricsSimpleWorker`, see
+RQ_WORKER_POOLS). The connection therefore stays open between jobs until it
+has been idle for MAIL_CONNECTION_IDLE_TIMEOUT seconds, and compiled
+templates and inline images (MIME parts) are read from disk once per worker
+process rather than per message. Under a forking worker, both only last for
+one job.
+
+A batch is moved to a processing list before it is sent and removed only
+after every message was sent or queued for a retry, so a crash, a timeout
+or a killed worker does not lose it: the next delivery job sends it first.
+Messages may then be sent twice, never not at all. One delivery job runs at
+a time.
+
+Messages that fail are retried in a new job with exponential backoff
+(MAIL_RETRY_BACKOFF * 2 ** attempt seconds) and given up after
+MAIL_MAX_ATTEMPTS attempts.
+
+Redis layout (raw keys, shared with the default cache database):
+    mail:outbox            List of queued messages (JSON).
+    mail:processing        List of messages of the batch being sent.
+    mail:flush-scheduled   Set while a delivery job is queued.
+    mail:delivery-lock     Held by the running delivery job; expires after
+                           MAIL_DELIVERY_LOCK_TIMEOUT seconds.
+
+Functions:
+    queue_mail: Queue a message for delivery.
+    build_message: Build an email message from its queued description.
+    send_messages: Send messages, retrying failures later.
+    deliver_outbox: Job sending everything in the outbox.
+    deliver_messages: Job retrying failed messages.
+"""
+
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+from datetime import timedelta
+from email.mime.image import MIMEImage
+from functools import lru_cache
+
+import django_rq
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django_redis import get_redis_connection
+from django_rq import job
+from redis.exceptions import LockError
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_KEY = 'mail:outbox'
+PROCESSING_KEY = 'mail:processing'
+SCHEDULED_KEY = 'mail:flush-scheduled'
+LOCK_KEY = 'mail:delivery-lock'
+
+_connection = None
+_connection_used_at = 0.0
+_connection_lock = threading.Lock()
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def queue_mail(subject: str, body: str, to: list, from_email: str = None, html_template: str = None,
+               context: dict = None, inline_images: list = ()) -> None:
+    """
+    Queue a message for delivery by a background job.
+
+    Args:
+        subject (str): Subject line.
+        body (str): Plain text body.
+        to (list): Recipient addresses.
+        from_email (str, optional): Sender. Defaults to DEFAULT_FROM_EMAIL.
+        html_template (str, optional): Template rendered as the HTML alternative.
+        context (dict, optional): Template context; must be JSON serializable.
+        inline_images (list, optional): `(path, content_id)` pairs, paths relative
+            to BASE_DIR, attached as inline images.
+    """
+    payload = {
+        'subject': subject,
+        'body': body,
+        'to': list(to),
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+        'html_template': html_template,
+        'context': context or {},
+        'inline_images': [list(image) for image in inline_images],
+        'attempts': 0,
+    }
+    redis = _redis()
+    redis.rpush(OUTBOX_KEY, json.dumps(payload))
+    _schedule_delivery(redis)
+
+
+def _schedule_delivery(redis, delay: int = 0) -> None:
+    # The flag expires on its own in case a queued job is lost.
+    if redis.set(SCHEDULED_KEY, 1, nx=True, ex=60 + delay):
+        if delay:
+            django_rq.get_queue('mail').enqueue_in(timedelta(seconds=delay), deliver_outbox)
+        else:
+            django_rq.get_queue('mail').enqueue(deliver_outbox)
+
+
+@lru_cache(maxsize=None)
+def _template(name: str):
+    return get_template(name)
+
+
+@lru_cache(maxsize=None)
+def _inline_image(path: str, content_id: str) -> MIMEImage:
+    # Attaching a part does not modify it, so one instance serves every message.
+    with open(os.path.join(settings.BASE_DIR, path), 'rb') as f:
+        image = MIMEImage(f.read())
+    image.add_header('Content-ID', f'<{content_id}>')
+    return image
+
+
+def build_message(payload: dict) -> EmailMultiAlternatives:
+    """
+    Build an email message from its queued description.
+
+    Args:
+        payload (dict): The description stored by `queue_mail`.
+
+    Returns:
+        EmailMultiAlternatives: The message, without a connection.
+    """
+    message = EmailMultiAlternatives(payload['subject'], payload['body'], payload['from_email'], payload['to'])
+    if payload['html_template']:
+        message.attach_alternative(_template(payload['html_template']).render(payload['context']), 'text/html')
+    for path, content_id in payload['inline_images']:
+        message.attach(_inline_image(path, content_id))
+    return message
+
+
+def _get_connection():
+    global _connection
+    if _connection is not None and time.monotonic() - _connection_used_at > settings.MAIL_CONNECTION_IDLE_TIMEOUT:
+        _close_connection()
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+        # Opened here, send_messages() leaves it open for the next message.
+        _connection.open()
+    return _connection
+
+
+def _close_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+        _connection = None
+
+
+def _send(message) -> None:
+    global _connection_used_at
+    try:
+        _get_connection().send_messages([message])
+    except smtplib.SMTPServerDisconnected:
+        # The server closed the idle connection; reconnect once.
+        _close_connection()
+        _get_connection().send_messages([message])
+    _connection_used_at = time.monotonic()
+
+
+def send_messages(payloads: list) -> int:
+    """
+    Send queued messages over the shared connection.
+
+    Messages that fail to build or to send are queued for another attempt
+    with exponential backoff.
+
+    Args:
+        payloads (list): Descriptions stored by `queue_mail`.
+
+    Returns:
+        int: The number of messages sent.
+    """
+    sent = 0
+    failed = []
+    with _connection_lock:
+        for payload in payloads:
+            try:
+                message = build_message(payload)
+            except Exception:
+                # A broken payload or template must not take the batch down with it.
+                logger.exception('Building mail to %s failed.', payload.get('to'))
+                failed.append(payload)
+                continue
+            try:
+                _send(message)
+                sent += 1
+            except (smtplib.SMTPException, OSError):
+                logger.exception('Sending mail to %s failed.', payload['to'])
+                _close_connection()
+                failed.append(payload)
+
+    retry = []
+    for payload in failed:
+        payload['attempts'] = payload.get('attempts', 0) + 1
+        if payload['attempts'] < settings.MAIL_MAX_ATTEMPTS:
+            retry.append(payload)
+        else:
+            logger.error('Giving up on mail to %s after %d attempts.', payload.get('to'), payload['attempts'])
+    if retry:
+        delay = settings.MAIL_RETRY_BACKOFF * 2 ** (min(payload['attempts'] for payload in retry) - 1)
+        django_rq.get_queue('mail').enqueue_in(timedelta(seconds=delay), deliver_messages, retry)
+    return sent
+
+
+@job('mail')
+def deliver_outbox() -> int:
+    """
+    Background job sending everything in the outbox in batches.
+
+    Queued by `queue_mail`. A batch left in the processing list by an
+    interrupted job is sent first. If another delivery job is running, the
+    job queues itself again a few seconds later and returns.
+
+    Returns:
+        int: The number of messages sent.
+    """
+    redis = _redis()
+    # Messages queued from now on queue the next job.
+    redis.delete(SCHEDULED_KEY)
+    lock = redis.lock(LOCK_KEY, timeout=settings.MAIL_DELIVERY_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        # The running job may already have seen an empty outbox.
+        _schedule_delivery(redis, delay=5)
+        return 0
+    try:
+        sent = 0
+        while True:
+            batch = redis.lrange(PROCESSING_KEY, 0, -1) or _claim_batch(redis)
+            if not batch:
+                return sent
+            sent += send_messages(_decode_batch(batch))
+            redis.delete(PROCESSING_KEY)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            pass
+
+
+def _claim_batch(redis) -> list:
+    # Moves up to MAIL_BATCH_SIZE messages atomically to the processing list.
+    pipe = redis.pipeline()
+    for _ in range(settings.MAIL_BATCH_SIZE):
+        pipe.lmove(OUTBOX_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+    return [raw for raw in pipe.execute() if raw is not None]
+
+
+def _decode_batch(batch: list) -> list:
+    payloads = []
+    for raw in batch:
+        try:
+            payloads.append(json.loads(raw))
+        except ValueError:
+            logger.error('Dropping malformed mail payload: %r', raw[:200])
+    return payloads
+
+
+@job('mail')
+def deliver_messages(payloads: list) -> int:
+    """
+    Background job retrying messages that failed to send.
+
+    Args:
+        payloads (list): Descriptions stored by `queue_mail`, with their attempt count.
+
+    Returns:
+        int: The number of messages sent.
+    """
+    return send_messages(payloads)
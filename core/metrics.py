@@ -0,0 +1,371 @@
+"""
+Prometheus metrics.
+
+`MetricsView` serves all metrics in the Prometheus text format at `/metrics`.
+Collected per process:
+
+    http_request_duration_seconds       Histogram by method, route and status.
+    django_db_queries_per_request       Histogram of queries per request, by route.
+    django_db_query_duration_seconds    Counter of time spent in queries, by route.
+    django_cache_requests_total         Cache lookups by keyspace (the first two
+                                        segments of the key, e.g. `catalog:stream`)
+                                        and result (`hit` or `miss`).
+    rq_job_duration_seconds             Histogram by task, queue and final status.
+    videoflix_transcode_seconds         Histogram of transcoding time by rendition.
+    videoflix_stream_bytes_total        Bytes streamed, by rendition.
+
+Read from Redis when scraped, so every process reports the same values:
+
+    rq_queue_jobs                       Queued, started and failed jobs per queue.
+    ratelimit_rejected_total            Rejected requests, see core.ratelimit.
+    videoflix_progress_updates_total    Progress updates, see videoflix.api.progress.
+
+Gunicorn and the RQ workers run several processes. When the environment
+variable PROMETHEUS_MULTIPROC_DIR points to an (empty, shared) directory,
+every process writes its values to files there and a scrape of any web
+worker adds them up. The entrypoint creates and empties the directory on
+start; gunicorn's `child_exit` hook cleans up after exited workers.
+
+RQ forks a work horse process per job. Metrics from inside a job would create
+files per job, so the horse records nothing itself: `MetricsWorker` measures
+the job from the worker process, and jobs report values such as the
+transcoding time through `observe_in_worker`. `MetricsSimpleWorker` (the mail
+pool) runs jobs without forking and records the same way.
+
+With METRICS_ENABLED off, the middleware removes itself at start-up and the
+default cache backend is used.
+
+Functions:
+    observe_in_worker: Record a histogram value from inside an RQ job.
+    observe_job: Record the duration and observations of a finished job.
+    metered_stream: Count the bytes of a streamed response.
+    render_metrics: Render all metrics in the Prometheus text format.
+
+Classes:
+    MetricsMiddleware: Records request latency and database queries per route.
+    MetricsRedisCache: Cache backend counting hits and misses.
+    MetricsWorker: RQ worker recording job durations.
+    MetricsSimpleWorker: The same for a worker running jobs in its own process.
+    MetricsView: Serves the metrics (optionally behind METRICS_TOKEN).
+"""
+
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils import timezone
+from django_redis.cache import RedisCache
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, disable_created_metrics,
+    generate_latest, multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+from rq import SimpleWorker, Worker, get_current_job
+from rq.exceptions import NoSuchJobError
+
+# Drops the `*_created` series, which double the output without being used.
+disable_created_metrics()
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time from request to response, by route.',
+    ['method', 'route', 'status'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+)
+DB_QUERIES = Histogram(
+    'django_db_queries_per_request', 'Database queries per request, by route.',
+    ['route'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_QUERY_SECONDS = Counter(
+    'django_db_query_duration_seconds', 'Time spent in database queries, by route.', ['route'],
+)
+CACHE_REQUESTS = Counter(
+    'django_cache_requests', 'Cache lookups by keyspace and result.', ['keyspace', 'result'],
+)
+JOB_DURATION = Histogram(
+    'rq_job_duration_seconds', 'Run time of RQ jobs, by task.',
+    ['task', 'queue', 'status'],
+    buckets=(.01, .05, .1, .5, 1, 5, 15, 60, 300, 900, 1800, 3600, 7200),
+)
+TRANSCODE_SECONDS = Histogram(
+    'videoflix_transcode_seconds', 'Time to transcode one rendition.',
+    ['rendition'], buckets=(5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200),
+)
+STREAM_BYTES = Counter('videoflix_stream_bytes', 'Bytes of video streamed, by rendition.', ['rendition'])
+
+# Histograms jobs may report to through `observe_in_worker`.
+JOB_HISTOGRAMS = {'transcode_seconds': TRANSCODE_SECONDS}
+
+# Cleared in RQ work horses, see the module docstring.
+_recording = True
+
+
+def observe_in_worker(name: str, value: float, **labels) -> None:
+    """
+    Record a histogram value from inside an RQ job.
+
+    The value is stored in the job's meta data and observed by `MetricsWorker`
+    once the job has finished. Outside a job it is observed directly.
+
+    Args:
+        name (str): Key of the histogram in JOB_HISTOGRAMS.
+        value (float): The observed value.
+        **labels: The histogram's labels.
+    """
+    job = get_current_job()
+    if job is None:
+        JOB_HISTOGRAMS[name].labels(**labels).observe(value)
+        return
+    job.meta.setdefault('metrics', []).append([name, value, labels])
+    job.save_meta()
+
+
+def observe_job(job, queue_name: str) -> None:
+    """
+    Record the duration and the `observe_in_worker` values of a finished job.
+
+    Args:
+        job (Job): The job, refreshed from Redis.
+        queue_name (str): Name of the queue the job came from.
+    """
+    if job.started_at is not None:
+        ended_at = job.ended_at or timezone.now()
+        JOB_DURATION.labels(job.func_name, queue_name, job.get_status(refresh=False)).observe(
+            max(0.0, (ended_at - job.started_at).total_seconds()))
+    for name, value, labels in job.meta.get('metrics', []):
+        JOB_HISTOGRAMS[name].labels(**labels).observe(value)
+
+
+def metered_stream(chunks, rendition: str):
+    """
+    Pass a streamed response body through, counting its bytes.
+
+    Args:
+        chunks (iterable): The response body.
+        rendition (str): Label of the rendition, e.g. "720p".
+
+    Yields:
+        bytes: The chunks, unchanged.
+    """
+    counter = STREAM_BYTES.labels(rendition)
+    try:
+        for chunk in chunks:
+            counter.inc(len(chunk))
+            yield chunk
+    finally:
+        # The response closes this generator, which in turn closes the file.
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _keyspace(key) -> str:
+    return ':'.join(str(key).split(':', 2)[:2])
+
+
+def _route(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else '<unmatched>'
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Record latency and database queries of every request, by route.
+
+    Requests that match no URL pattern are recorded as `<unmatched>`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(timer):
+            response = self.get_response(request)
+        self.observe(request, response, timer, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # Database connections belong to a thread: the timer is attached on
+        # the thread that runs this request's sync code and queries.
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        await sync_to_async(self.attach)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self.detach)(timer)
+        self.observe(request, response, timer, time.perf_counter() - started)
+        return response
+
+    def attach(self, timer):
+        connections['default'].execute_wrappers.append(timer)
+
+    def detach(self, timer):
+        connections['default'].execute_wrappers.remove(timer)
+
+    def observe(self, request, response, timer, duration):
+        route = _route(request)
+        REQUEST_DURATION.labels(request.method, route, response.status_code).observe(duration)
+        DB_QUERIES.labels(route).observe(timer.count)
+        if timer.seconds:
+            DB_QUERY_SECONDS.labels(route).inc(timer.seconds)
+
+
+class MetricsRedisCache(RedisCache):
+    """
+    django-redis cache backend counting hits and misses per keyspace.
+    """
+
+    def get(self, key, default=None, version=None, client=None):
+        value = super().get(key, default=default, version=version, client=client)
+        if _recording:
+            CACHE_REQUESTS.labels(_keyspace(key), 'miss' if value is default else 'hit').inc()
+        return value
+
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values = super().get_many(keys, *args, **kwargs)
+        if _recording:
+            for key in keys:
+                CACHE_REQUESTS.labels(_keyspace(key), 'hit' if key in values else 'miss').inc()
+        return values
+
+
+class MetricsWorker(Worker):
+    """
+    RQ worker recording the duration of every job it runs.
+
+    Selected through `RQ['WORKER_CLASS']`, so `rqworker` and `rqsupervisor`
+    use it without further options.
+    """
+
+    def main_work_horse(self, *args, **kwargs):
+        global _recording
+        _recording = False
+        return super().main_work_horse(*args, **kwargs)
+
+    def execute_job(self, job, queue):
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            try:
+                job.refresh()
+            except NoSuchJobError:
+                # Deleted on completion (result_ttl=0); nothing left to measure.
+                pass
+            else:
+                observe_job(job, queue.name)
+
+
+class MetricsSimpleWorker(MetricsWorker, SimpleWorker):
+    """
+    Non-forking RQ worker recording job durations.
+
+    Jobs run in the worker process itself, so state such as an open SMTP
+    connection survives from one job to the next (see core.mail).
+    """
+
+
+class RedisStatsCollector:
+    """
+    Collector reading queue depths and shared counters from Redis at scrape time.
+    """
+
+    def collect(self):
+        import django_rq
+        from core.ratelimit import get_rate_limit_stats
+        from videoflix.api.progress import get_progress_write_stats
+
+        jobs = GaugeMetricFamily('rq_queue_jobs', 'Jobs per RQ queue and state.', labels=['queue', 'state'])
+        for name in settings.RQ_QUEUES:
+            queue = django_rq.get_queue(name)
+            jobs.add_metric([name, 'queued'], queue.count)
+            jobs.add_metric([name, 'started'], queue.started_job_registry.count)
+            jobs.add_metric([name, 'failed'], queue.failed_job_registry.count)
+        yield jobs
+
+        rejected = CounterMetricFamily(
+            'ratelimit_rejected', 'Requests rejected by rate limits.', labels=['scope', 'limit'])
+        for key, value in get_rate_limit_stats().items():
+            scope, kind = key.split(':', 1)
+            rejected.add_metric([scope, kind], value)
+        yield rejected
+
+        progress = CounterMetricFamily(
+            'videoflix_progress_updates', 'Playback progress updates by outcome.', labels=['outcome'])
+        for outcome, value in get_progress_write_stats().items():
+            if outcome != 'suppression_ratio':
+                progress.add_metric([outcome], value)
+        yield progress
+
+
+_redis_registry = CollectorRegistry(auto_describe=False)
+_redis_registry.register(RedisStatsCollector())
+
+
+def render_metrics() -> bytes:
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        bytes: The per-process metrics (summed over all processes in
+        multiprocess mode) followed by the Redis-backed ones.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(_redis_registry)
+
+
+class HasMetricsToken(BasePermission):
+    """
+    Allow everyone if METRICS_TOKEN is empty, else require `Authorization: Bearer <token>`.
+    """
+
+    def has_permission(self, request, view):
+        if not settings.METRICS_TOKEN:
+            return True
+        return hmac.compare_digest(
+            request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}')
+
+
+class MetricsView(APIView):
+    """
+    API view serving all metrics in the Prometheus text format.
+    """
+    authentication_classes = []
+    permission_classes = [HasMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
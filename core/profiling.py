@@ -0,0 +1,315 @@
+"""
+Opt-in, sampled request profiling.
+
+With PROFILING_ENABLED, `ProfilingMiddleware` profiles a request when
+
+    - a random draw falls below PROFILING_SAMPLE_RATE, or
+    - it carries an `X-Profile` header with a token from `make_profile_token`
+      (signed with SECRET_KEY, valid for PROFILING_TOKEN_MAX_AGE seconds).
+
+A profiled request is sampled by a background thread every
+PROFILING_INTERVAL seconds (a statistical profile: the request thread's call
+stack is recorded, not every call), and every SQL query of the `default`
+database is recorded with its duration. The profile is stored in Redis for
+PROFILING_TTL seconds and its ID returned in the `X-Profile-Id` response
+header. Staff users download profiles from `api/profiles/`; the `folded`
+endpoint returns collapsed stacks ("frame;frame;frame count" per line), the
+input format of flamegraph.pl, speedscope and inferno.
+
+Under ASGI the middleware runs as a coroutine if everything below it in
+MIDDLEWARE is async-capable (otherwise Django calls it on the request's
+thread, as under WSGI). The sync parts of a request (DRF views, ORM queries)
+then run on a thread of their own; that thread is sampled and its queries
+recorded, while time spent awaiting on the event loop does not show up in
+the stacks.
+
+Without PROFILING_ENABLED the middleware removes itself at start-up, so it
+costs nothing. Enabled, unprofiled requests cost one header lookup and one
+random number.
+
+Redis layout (raw keys, shared with the default cache database):
+    profile:<id>     JSON profile, expires after PROFILING_TTL seconds.
+    profile:index    Sorted set of profile IDs by time, trimmed to
+                     PROFILING_MAX_PROFILES entries.
+
+Functions:
+    make_profile_token: Create a value for the `X-Profile` header.
+    get_profile: Load a stored profile.
+    list_profiles: List recent profiles, newest first.
+
+Classes:
+    StackSampler: Thread sampling another thread's call stack.
+    ProfilingMiddleware: Profiles sampled or explicitly requested requests.
+    ProfileListView: Lists recent profiles (staff only).
+    ProfileDetailView: Returns one profile as JSON (staff only).
+    ProfileFoldedView: Returns one profile's collapsed stacks (staff only).
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django_redis import get_redis_connection
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+PROFILE_KEY = 'profile:{profile_id}'
+INDEX_KEY = 'profile:index'
+HEADER = 'HTTP_X_PROFILE'
+TOKEN_SALT = 'core.profiling'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def make_profile_token() -> str:
+    """
+    Create a value for the `X-Profile` header that forces profiling.
+
+        python manage.py shell -c "from core.profiling import make_profile_token; print(make_profile_token())"
+
+    Returns:
+        str: A signed, timestamped token valid for PROFILING_TOKEN_MAX_AGE seconds.
+    """
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def _valid_token(token: str) -> bool:
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}.{code.co_qualname}:{frame.f_lineno}'.replace(';', ':').replace(' ', '_')
+
+
+class StackSampler(threading.Thread):
+    """
+    Thread recording another thread's call stack at a fixed interval.
+
+    Attributes:
+        stacks (Counter): Collapsed stack ("outer;...;inner") -> number of samples.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self) -> Counter:
+        """
+        Stop sampling and return the recorded stacks.
+        """
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+class _QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({'sql': sql, 'ms': round((time.perf_counter() - started) * 1000, 3)})
+
+
+def _store(profile: dict) -> None:
+    redis = _redis()
+    pipe = redis.pipeline()
+    pipe.set(PROFILE_KEY.format(profile_id=profile['id']), json.dumps(profile), ex=settings.PROFILING_TTL)
+    pipe.zadd(INDEX_KEY, {profile['id']: profile['started_at']})
+    pipe.zremrangebyrank(INDEX_KEY, 0, -settings.PROFILING_MAX_PROFILES - 1)
+    pipe.execute()
+
+
+def get_profile(profile_id: str):
+    """
+    Load a stored profile.
+
+    Args:
+        profile_id (str): ID from the `X-Profile-Id` header.
+
+    Returns:
+        dict or None: The profile, or None if it does not exist (anymore).
+    """
+    raw = _redis().get(PROFILE_KEY.format(profile_id=profile_id))
+    return json.loads(raw) if raw else None
+
+
+def list_profiles() -> list:
+    """
+    List recent profiles, newest first, without their stacks and queries.
+
+    Returns:
+        list: Dicts with `id`, `method`, `path`, `status`, `duration_ms`,
+        `query_count`, `query_ms` and `started_at`.
+    """
+    redis = _redis()
+    ids = [profile_id.decode() for profile_id in redis.zrevrange(INDEX_KEY, 0, -1)]
+    raws = redis.mget([PROFILE_KEY.format(profile_id=profile_id) for profile_id in ids]) if ids else []
+    summaries = []
+    for raw in raws:
+        if raw:
+            profile = json.loads(raw)
+            summaries.append({key: value for key, value in profile.items() if key not in ('stacks', 'queries')})
+    return summaries
+
+
+class ProfilingMiddleware:
+    """
+    Profile sampled requests and requests with a valid `X-Profile` header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def should_profile(self, request) -> bool:
+        token = request.META.get(HEADER)
+        if token is not None:
+            return _valid_token(token)
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL)
+        recorder = _QueryRecorder()
+        started_at = time.time()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with connections['default'].execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        self.store(request, response, recorder, stacks, started_at, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_profile(request):
+            return await self.get_response(request)
+
+        # Database connections belong to a thread, so the recorder is attached
+        # on the thread this request's sync code runs on (thread-sensitive
+        # calls of one request share a thread), which is also the one sampled.
+        recorder = _QueryRecorder()
+        thread_id = await sync_to_async(self.attach)(recorder)
+        sampler = StackSampler(thread_id, settings.PROFILING_INTERVAL)
+        started_at = time.time()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+            duration = time.perf_counter() - started
+            await sync_to_async(self.detach)(recorder)
+        await sync_to_async(self.store)(request, response, recorder, stacks, started_at, duration)
+        return response
+
+    def attach(self, recorder) -> int:
+        connections['default'].execute_wrappers.append(recorder)
+        return threading.get_ident()
+
+    def detach(self, recorder) -> None:
+        connections['default'].execute_wrappers.remove(recorder)
+
+    def store(self, request, response, recorder, stacks, started_at, duration):
+        duration_ms = duration * 1000
+        profile_id = uuid.uuid4().hex
+        _store({
+            'id': profile_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'query_count': len(recorder.queries),
+            'query_ms': round(sum(query['ms'] for query in recorder.queries), 3),
+            'started_at': started_at,
+            'interval': settings.PROFILING_INTERVAL,
+            'queries': recorder.queries,
+            'stacks': dict(stacks),
+        })
+        response['X-Profile-Id'] = profile_id
+
+
+class ProfileListView(APIView):
+    """
+    API view listing recent profiles, newest first. Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+
+class ProfileDetailView(APIView):
+    """
+    API view returning a profile with its SQL queries and stacks. Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = get_profile(profile_id)
+        if profile is None:
+            raise Http404
+        return Response(profile)
+
+
+class ProfileFoldedView(APIView):
+    """
+    API view returning a profile's collapsed stacks as text, for
+    flamegraph.pl, speedscope or inferno. Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = get_profile(profile_id)
+        if profile is None:
+            raise Http404
+        lines = [f'{stack} {count}' for stack, count in sorted(profile['stacks'].items())]
+        response = HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.folded"'
+        return response
@@ -0,0 +1,141 @@
+"""
+Sliding-window rate limiting for unauthenticated endpoints.
+
+Login, registration and password reset hash passwords or send mail, so
+bursts are rejected by a DRF throttle that runs in `APIView.initial`,
+before the handler does any work. Limits are configured per scope in
+RATE_LIMITS, e.g. `{'login': {'ip': '30/min', 'email': '10/min'}}`; a view
+opts in with `throttle_classes = [SlidingWindowThrottle]` and
+`rate_limit_scope = 'login'`.
+
+Each limit is a Redis sorted set of request timestamps (a sliding log), so
+there is no burst at window boundaries as with fixed windows. All limits of a
+request are checked and recorded atomically by one Lua script; rejected
+requests are not recorded, so clients regain access as soon as old requests
+leave the window.
+
+Redis layout (raw keys, shared with the default cache database):
+    ratelimit:<scope>:<kind>:<identifier>   Sorted set of request times (ms).
+                                            Emails are stored as SHA-256 hashes.
+    ratelimit:stats                         Hash "<scope>:<kind>" -> number of
+                                            rejected requests.
+
+Functions:
+    parse_rate: Parse a rate such as '10/min'.
+    get_rate_limit_stats: Report rejected requests per scope and limit.
+
+Classes:
+    SlidingWindowThrottle: DRF throttle enforcing the scope's RATE_LIMITS.
+"""
+
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework.throttling import BaseThrottle
+
+STATS_KEY = 'ratelimit:stats'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS: one sorted set per limit. ARGV: now (ms), member, then window (ms)
+# and limit for each key. Returns {0, 0} if allowed, otherwise the 1-based
+# index of the exceeded limit and the milliseconds until a slot frees up.
+CHECK_SCRIPT = """
+local now = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+    local window, limit = tonumber(ARGV[2 * i + 1]), tonumber(ARGV[2 * i + 2])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        return {i, tonumber(oldest[2]) + window - now}
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, tonumber(ARGV[2 * i + 1]))
+end
+return {0, 0}
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def parse_rate(rate: str) -> tuple:
+    """
+    Parse a rate such as '10/min' or '100/hour'.
+
+    Args:
+        rate (str): Number of requests, a slash and a period (s, min, hour, day).
+
+    Returns:
+        tuple: `(limit, window_in_seconds)`.
+    """
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period[0]]
+
+
+def get_rate_limit_stats() -> dict:
+    """
+    Report how many requests were rejected.
+
+    Returns:
+        dict: Mapping of "<scope>:<kind>" (e.g. "login:ip") to rejected requests.
+    """
+    return {key.decode(): int(value) for key, value in _redis().hgetall(STATS_KEY).items()}
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Throttle enforcing the limits of the view's `rate_limit_scope`.
+
+    Supported limit kinds are `ip` (the client address; X-Forwarded-For is
+    only trusted behind `NUM_PROXIES` proxies) and `email` (the `email` field of the request body,
+    case-insensitive). A kind without an identifier in the request is skipped.
+    """
+
+    def get_identifier(self, kind: str, request):
+        if kind == 'ip':
+            return self.get_ident(request)
+        if kind == 'email':
+            email = request.data.get('email') if hasattr(request.data, 'get') else None
+            if not email or not isinstance(email, str):
+                return None
+            return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        raise ValueError(f'Unknown rate limit kind: {kind}')
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'rate_limit_scope', None)
+        limits = settings.RATE_LIMITS.get(scope) if settings.RATE_LIMIT_ENABLED else None
+        if not limits:
+            return True
+
+        kinds, keys, args = [], [], []
+        for kind, rate in limits.items():
+            identifier = self.get_identifier(kind, request)
+            if identifier is None:
+                continue
+            limit, window = parse_rate(rate)
+            kinds.append(kind)
+            keys.append(f'ratelimit:{scope}:{kind}:{identifier}')
+            args += [window * 1000, limit]
+        if not keys:
+            return True
+
+        redis = _redis()
+        now = int(time.time() * 1000)
+        exceeded, retry_in = redis.register_script(CHECK_SCRIPT)(
+            keys=keys, args=[now, f'{now}-{uuid.uuid4().hex}', *args])
+        if not exceeded:
+            return True
+
+        redis.hincrby(STATS_KEY, f'{scope}:{kinds[exceeded - 1]}', 1)
+        self.retry_in = max(1, -(-int(retry_in) // 1000))
+        return False
+
+    def wait(self):
+        return self.retry_in
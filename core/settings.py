@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'django_rq',
@@ -56,8 +57,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -106,6 +109,21 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Database connections are kept open for DB_CONN_MAX_AGE seconds ("none" keeps
+# them forever, 0 closes them after each request) and checked before reuse.
+# Under ASGI (core.asgi) they are always closed after each request: every
+# request runs its sync code on a thread of its own, whose persistent
+# connection would never be reused or reliably closed. Use DB_POOL there.
+# With DB_POOL=True each process instead keeps a psycopg 3 connection pool of
+# DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections. gunicorn.conf.py exports
+# how many a worker can use at once: one per thread, or
+# GUNICORN_ASYNC_CONCURRENCY under uvicorn. See the README section on database
+# connections.
+GUNICORN_DB_CONCURRENCY = int(os.getenv("GUNICORN_DB_CONCURRENCY", 1))
+DB_POOL = os.getenv("DB_POOL", "False").lower() == "true"
+DB_CONN_MAX_AGE = os.getenv("DB_CONN_MAX_AGE", "60")
+ASGI = os.getenv("DJANGO_ASGI", "False").lower() == "true"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -113,13 +131,38 @@ DATABASES = {
         "USER": os.environ.get("DB_USER", default="videoflix_user"),
         "PASSWORD": os.environ.get("DB_PASSWORD", default="supersecretpassword"),
         "HOST": os.environ.get("DB_HOST", default="db"),
-        "PORT": os.environ.get("DB_PORT", default=5432)
+        "PORT": os.environ.get("DB_PORT", default=5432),
+        # Pooled connections are returned to the pool after each request instead.
+        "CONN_MAX_AGE": 0 if DB_POOL or ASGI else (
+            None if DB_CONN_MAX_AGE.lower() == "none" else int(DB_CONN_MAX_AGE)),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True").lower() == "true",
+        "OPTIONS": {},
     }
 }
 
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", GUNICORN_DB_CONCURRENCY)),
+        # Seconds a request waits for a free connection before failing.
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        # Idle connections above min_size are closed after this many seconds.
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+        # Checks a connection with a round trip before handing it out.
+        "check": ConnectionPool.check_connection,
+    }
+
+# Prometheus metrics at /metrics (see core.metrics). With METRICS_TOKEN set,
+# scrapers must send "Authorization: Bearer <token>".
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        # Counts cache hits and misses for the metrics endpoint.
+        "BACKEND": "core.metrics.MetricsRedisCache" if METRICS_ENABLED else "django_redis.cache.RedisCache",
         "LOCATION": os.environ.get("REDIS_LOCATION", default="redis://redis:6379/1"),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient"
@@ -128,13 +171,79 @@ CACHES = {
     }
 }
 
-RQ_QUEUES = {
-    'default': {
+
+def rq_queue(timeout):
+    return {
         'HOST': os.environ.get("REDIS_HOST", default="redis"),
         'PORT': os.environ.get("REDIS_PORT", default=6379),
         'DB': os.environ.get("REDIS_DB", default=0),
-        'DEFAULT_TIMEOUT': 900,
+        'DEFAULT_TIMEOUT': timeout,
         'REDIS_CLIENT_KWARGS': {},
+    }
+
+
+# Queues by kind of work, so long encodes never delay short jobs. Timeouts
+# (seconds) apply to every job of the queue.
+#   transcode-high   Renditions up to VIDEO_PRIORITY_MAX_HEIGHT.
+#   transcode-bulk   Larger renditions.
+#   media-light      Probing, thumbnails.
+#   mail             Outgoing mail (core.mail).
+#   default          Progress flushes, analytics rollups, token pruning.
+RQ_QUEUES = {
+    'default': rq_queue(int(os.getenv("RQ_DEFAULT_TIMEOUT", 900))),
+    'transcode-high': rq_queue(int(os.getenv("RQ_TRANSCODE_HIGH_TIMEOUT", 1800))),
+    'transcode-bulk': rq_queue(int(os.getenv("RQ_TRANSCODE_BULK_TIMEOUT", 7200))),
+    'media-light': rq_queue(int(os.getenv("RQ_MEDIA_LIGHT_TIMEOUT", 300))),
+    'mail': rq_queue(int(os.getenv("RQ_MAIL_TIMEOUT", 120))),
+}
+
+# Worker pool run by `manage.py rqsupervisor`: bounds, jobs per worker process
+# before it is replaced, queued jobs per worker and seconds the oldest job may
+# wait before scaling up, and seconds of surplus before scaling down.
+RQ_MIN_WORKERS = int(os.getenv("RQ_MIN_WORKERS", 1))
+RQ_MAX_WORKERS = int(os.getenv("RQ_MAX_WORKERS", os.cpu_count() or 1))
+RQ_WORKER_MAX_JOBS = int(os.getenv("RQ_WORKER_MAX_JOBS", 50))
+RQ_SCALE_UP_BACKLOG = int(os.getenv("RQ_SCALE_UP_BACKLOG", 2))
+RQ_SCALE_UP_WAIT = float(os.getenv("RQ_SCALE_UP_WAIT", 60))
+RQ_SCALE_DOWN_DELAY = float(os.getenv("RQ_SCALE_DOWN_DELAY", 120))
+RQ_SUPERVISOR_INTERVAL = float(os.getenv("RQ_SUPERVISOR_INTERVAL", 5))
+
+# Worker pools, one `rqsupervisor --pool <name>` each; workers take jobs from
+# their queues in the order listed. The transcode-bulk pool helps out with
+# transcode-high first. Mail has a pool of non-forking workers, so the SMTP
+# connection stays open between jobs; it and the light pool run the scheduler
+# for their queues.
+# Records job durations for the metrics endpoint.
+RQ = {
+    'WORKER_CLASS': 'core.metrics.MetricsWorker',
+}
+
+RQ_WORKER_POOLS = {
+    'mail': {
+        'queues': ['mail'],
+        'min_workers': 1,
+        # Delivery jobs run one at a time anyway (see core.mail).
+        'max_workers': 1,
+        'max_jobs': 1000,
+        'with_scheduler': True,
+        'worker_class': 'core.metrics.MetricsSimpleWorker',
+    },
+    'light': {
+        'queues': ['media-light', 'default'],
+        'min_workers': 1,
+        'max_workers': int(os.getenv("RQ_LIGHT_MAX_WORKERS", 2)),
+        'max_jobs': 1000,
+        'with_scheduler': True,
+    },
+    'transcode-high': {
+        'queues': ['transcode-high'],
+        'min_workers': 1,
+        'max_workers': int(os.getenv("RQ_TRANSCODE_HIGH_MAX_WORKERS", 2)),
+    },
+    'transcode-bulk': {
+        'queues': ['transcode-high', 'transcode-bulk'],
+        'min_workers': 0,
+        'max_workers': int(os.getenv("RQ_TRANSCODE_BULK_MAX_WORKERS", RQ_MAX_WORKERS)),
     },
 }
 
@@ -197,17 +306,111 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "False").lower() == "true"
 EMAIL_USE_SSL = os.getenv("EMAIL_USE_SSL", "False").lower() == "true"
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "webmaster@localhost")
+
+# Mail queue (see core.mail)
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BACKOFF = int(os.getenv("MAIL_RETRY_BACKOFF", 30))
+MAIL_CONNECTION_IDLE_TIMEOUT = int(os.getenv("MAIL_CONNECTION_IDLE_TIMEOUT", 60))
+# Longer than the mail queue's job timeout, so the lock outlives a running job.
+MAIL_DELIVERY_LOCK_TIMEOUT = int(os.getenv("MAIL_DELIVERY_LOCK_TIMEOUT", 180))
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:4200")
 
 
+# Video catalog pagination (keyset/cursor based)
+VIDEO_PAGE_SIZE = int(os.getenv("VIDEO_PAGE_SIZE", 24))
+VIDEO_MAX_PAGE_SIZE = int(os.getenv("VIDEO_MAX_PAGE_SIZE", 100))
+VIDEO_RAIL_SIZE = int(os.getenv("VIDEO_RAIL_SIZE", 10))
+
+# Heights (in pixels) process_video transcodes every upload to
+VIDEO_RENDITION_HEIGHTS = [
+    int(height) for height in os.getenv("VIDEO_RENDITION_HEIGHTS", "180,360,720,1080").split(",")
+]
+# Renditions up to this height are transcoded on the transcode-high queue
+VIDEO_PRIORITY_MAX_HEIGHT = int(os.getenv("VIDEO_PRIORITY_MAX_HEIGHT", 360))
+
+# Seconds a cached catalog response lives; entries are invalidated earlier
+# through the catalog version bumped on Video changes.
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
+# Playback progress is buffered in Redis and flushed to the database in bulk.
+PROGRESS_FLUSH_INTERVAL = int(os.getenv("PROGRESS_FLUSH_INTERVAL", 5))
+# Upper bound in seconds for one flush; the flush lock expires after it.
+PROGRESS_FLUSH_LOCK_TIMEOUT = int(os.getenv("PROGRESS_FLUSH_LOCK_TIMEOUT", 300))
+PROGRESS_BUFFER_TTL = int(os.getenv("PROGRESS_BUFFER_TTL", 86400))
+PROGRESS_BATCH_MAX_SIZE = int(os.getenv("PROGRESS_BATCH_MAX_SIZE", 500))
+# Coalescing: drop heartbeats faster than the throttle interval and only queue a
+# position for the database once it moved by the minimum delta or the maximum
+# interval passed (pauses and ends are always queued). All values in seconds.
+PROGRESS_THROTTLE_INTERVAL = float(os.getenv("PROGRESS_THROTTLE_INTERVAL", 1))
+PROGRESS_MIN_DELTA = float(os.getenv("PROGRESS_MIN_DELTA", 5))
+PROGRESS_MAX_INTERVAL = float(os.getenv("PROGRESS_MAX_INTERVAL", 30))
+# Share of a video's duration after which it counts as finished and leaves the
+# continue-watching feed.
+CONTINUE_WATCHING_FINISHED_RATIO = float(os.getenv("CONTINUE_WATCHING_FINISHED_RATIO", 0.95))
+
+# Watch analytics: a viewer's update after this many idle seconds starts a new
+# view, and watched seconds are capped at elapsed time times this playback rate.
+WATCH_SESSION_GAP = int(os.getenv("WATCH_SESSION_GAP", 1800))
+WATCH_MAX_PLAYBACK_RATE = float(os.getenv("WATCH_MAX_PLAYBACK_RATE", 2))
+
+# Postgres text search configuration used for the video search vector
+VIDEO_SEARCH_CONFIG = os.getenv("VIDEO_SEARCH_CONFIG", "simple")
+
+
+
+# Threads hashing passwords for login, registration and password reset; caps
+# hashing concurrency independently of the number of requests in flight.
+PASSWORD_HASHING_MAX_WORKERS = int(os.getenv("PASSWORD_HASHING_MAX_WORKERS", 2))
+
+# Sliding-window rate limits for unauthenticated endpoints (see core.ratelimit),
+# per scope and per client IP and/or email, as "<requests>/<s|min|hour|day>".
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+RATE_LIMITS = {
+    'login': {'ip': os.getenv("RATE_LIMIT_LOGIN_IP", "30/min"),
+              'email': os.getenv("RATE_LIMIT_LOGIN_EMAIL", "10/min")},
+    'register': {'ip': os.getenv("RATE_LIMIT_REGISTER_IP", "20/hour"),
+                 'email': os.getenv("RATE_LIMIT_REGISTER_EMAIL", "5/hour")},
+    'password_reset': {'ip': os.getenv("RATE_LIMIT_PASSWORD_RESET_IP", "20/hour"),
+                       'email': os.getenv("RATE_LIMIT_PASSWORD_RESET_EMAIL", "5/hour")},
+    'password_reset_confirm': {'ip': os.getenv("RATE_LIMIT_PASSWORD_RESET_CONFIRM_IP", "30/hour")},
+}
+
+# Request profiling (see core.profiling): off unless enabled; then a share of
+# requests, or those with a signed X-Profile header, is sampled every
+# PROFILING_INTERVAL seconds and stored in Redis.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", 0.005))
+PROFILING_TOKEN_MAX_AGE = int(os.getenv("PROFILING_TOKEN_MAX_AGE", 3600))
+PROFILING_TTL = int(os.getenv("PROFILING_TTL", 86400))
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", 200))
+
+# Token authentication cache: seconds a resolved token is kept in Redis and in
+# each process (the latter bounds how long other processes miss an invalidation).
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", 300))
+AUTH_TOKEN_LOCAL_TTL = float(os.getenv("AUTH_TOKEN_LOCAL_TTL", 5))
+AUTH_TOKEN_LOCAL_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_LOCAL_MAX_ENTRIES", 10000))
+# Token lifetime in seconds, renewed on use at most once per renew interval;
+# expired tokens are deleted in batches every prune interval.
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", 14 * 24 * 3600))
+AUTH_TOKEN_RENEW_INTERVAL = int(os.getenv("AUTH_TOKEN_RENEW_INTERVAL", 3600))
+AUTH_TOKEN_PRUNE_INTERVAL = int(os.getenv("AUTH_TOKEN_PRUNE_INTERVAL", 3600))
+AUTH_TOKEN_PRUNE_BATCH_SIZE = int(os.getenv("AUTH_TOKEN_PRUNE_BATCH_SIZE", 1000))
+# Maximum number of tokens per batch validation request.
+TOKEN_VALIDATION_BATCH_MAX_SIZE = int(os.getenv("TOKEN_VALIDATION_BATCH_MAX_SIZE", 100))
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'user.authentication.CachedTokenAuthentication',
+    ],
+    # Number of reverse proxies in front of gunicorn. Client IPs for rate limits
+    # are taken from X-Forwarded-For only behind that many proxies; with 0 the
+    # header is ignored, since clients can send any value in it.
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", 0)),
 }
 
 
@@ -19,6 +19,9 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import MetricsView
+from core.profiling import ProfileListView, ProfileDetailView, ProfileFoldedView
+
 
 
 urlpatterns = [
@@ -30,6 +33,10 @@ urlpatterns = [
     path('api/password-reset/', include('password_reset.api.urls')),
     path('api/videoflix/', include('videoflix.api.urls')),
     path('django-rq/', include('django_rq.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('api/profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('api/profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('api/profiles/<str:profile_id>/folded/', ProfileFoldedView.as_view(), name='profile-folded'),
 ]
 
 
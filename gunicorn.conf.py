@@ -0,0 +1,98 @@
+"""
+Gunicorn configuration, sized from the CPU count and environment.
+
+GUNICORN_WORKER_CLASS selects the serving mode:
+    sync      One request per process. Predictable for CPU-bound work, but a
+              slow client or a long video stream occupies a whole worker.
+    gthread   GUNICORN_THREADS threads per process (default). Threads wait on
+              I/O and streaming responses cheaply; the default for production.
+    uvicorn   ASGI via uvicorn workers serving `core.asgi`. Async views
+              (login, registration, password reset) run on the event loop.
+              Every request runs its sync parts (ORM, authentication) on a
+              thread of its own, so GUNICORN_ASYNC_CONCURRENCY sets how many
+              database connections a process may use.
+
+Every value can be overridden through the environment, see the README
+section on server configuration for the variables and how to benchmark the
+modes against each other.
+"""
+
+import os
+
+
+def _cpu_count():
+    # Respects CPU affinity (e.g. docker --cpuset-cpus), unlike os.cpu_count().
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+cpus = _cpu_count()
+mode = os.getenv('GUNICORN_WORKER_CLASS', 'gthread').lower()
+
+if mode == 'sync':
+    worker_class = 'sync'
+    workers = _env_int('GUNICORN_WORKERS', 2 * cpus + 1)
+    threads = 1
+elif mode == 'gthread':
+    worker_class = 'gthread'
+    workers = _env_int('GUNICORN_WORKERS', cpus + 1)
+    threads = _env_int('GUNICORN_THREADS', 4)
+elif mode == 'uvicorn':
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    workers = _env_int('GUNICORN_WORKERS', cpus)
+    threads = 1
+else:
+    raise ValueError(f'Unknown GUNICORN_WORKER_CLASS: {mode!r} (use sync, gthread or uvicorn)')
+
+wsgi_app = 'core.asgi:application' if mode == 'uvicorn' else 'core.wsgi:application'
+
+# Requests per process that can hold a database connection at the same time:
+# one per thread, or under uvicorn one per concurrent request.
+if mode == 'uvicorn':
+    db_concurrency = _env_int('GUNICORN_ASYNC_CONCURRENCY', 10)
+else:
+    db_concurrency = threads
+
+# Django sizes the database connection pool per process from this value.
+os.environ['GUNICORN_DB_CONCURRENCY'] = str(db_concurrency)
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Seconds a worker may stay silent before it is restarted. gthread and
+# uvicorn workers keep reporting while a request streams.
+timeout = _env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Seconds an idle keep-alive connection stays open; ignored by sync workers.
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+# Restart workers after this many requests (plus jitter, so they do not
+# restart together) to bound slow memory growth; 0 disables recycling.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+# Load Django once in the master and fork it into the workers, which saves
+# memory and start-up time. Settings and code then only reload on restart.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+# Worker heartbeat files on tmpfs; a disk-backed /tmp can block workers in containers.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    server.log.info(
+        'Serving %s with %d %s worker(s) x %d thread(s) on %d CPU(s), '
+        '%d database connection(s) per worker, preload=%s',
+        wsgi_app, workers, mode, threads, cpus, db_concurrency, preload_app,
+    )
+
+
+def child_exit(server, worker):
+    # Removes the exited worker's live gauge files in Prometheus multiprocess
+    # mode (see core/metrics.py); its counters and histograms are kept.
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,21 +1,34 @@
-from rest_framework.views import APIView
+from django.contrib.auth import get_user_model
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.authtoken.models import Token
+from asgiref.sync import sync_to_async
 
+from core.async_views import AsyncAPIView
+from core.hashing import acheck_password, amake_password
+from core.ratelimit import SlidingWindowThrottle
+from user.models import AuthToken
 from .serializers import LoginSerializer
 
+User = get_user_model()
 
-class LoginView(APIView):
+
+class LoginView(AsyncAPIView):
     """
     API view for handling user login.
     Accepts POST requests with email and password, validates the credentials,
-    and returns an authentication token upon success.
+    and returns an authentication token upon success. Each device gets its own
+    expiring token (see `user.models.AuthToken`).
+
+    The password check runs on the bounded hashing pool (see `core.hashing`),
+    so slow hashing neither blocks the event loop nor ties up a request worker.
+    Requests over the `login` rate limits are rejected before any hashing.
     """
     authentication_classes = []
     permission_classes = []
+    throttle_classes = [SlidingWindowThrottle]
+    rate_limit_scope = 'login'
 
-    def post(self, request):
+    async def post(self, request):
         """
         Handles POST request for user login.
 
@@ -23,17 +36,37 @@ class LoginView(APIView):
             request (Request): The incoming HTTP request containing login data.
 
         Returns:
-            Response: A successful response with token and user information,
+            Response: A successful response with token, its expiry and user information,
                       or an error response with validation errors.
         """
         serializer = LoginSerializer(data=request.data)
-        print(serializer)
-        if serializer.is_valid():
-            user = serializer.validated_data['user']
-            token, created = Token.objects.get_or_create(user=user)
-            return Response({
-                'token': token.key,
-                'email': user.email,
-                'user_id': user.id
-            }, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+        try:
+            user = await User.objects.aget_by_email(email)
+        except User.DoesNotExist:
+            # Hash anyway so response times do not reveal which emails exist.
+            await amake_password(password)
+            return self.invalid_credentials()
+
+        if not await acheck_password(user, password):
+            return self.invalid_credentials()
+
+        if not user.is_active:
+            return Response({'non_field_errors': ["Email not confirmed."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        device = serializer.validated_data.get('device') or request.META.get('HTTP_USER_AGENT', '')
+        token = await sync_to_async(AuthToken.objects.issue)(user, device)
+        return Response({
+            'token': token.key,
+            'expires_at': token.expires_at,
+            'email': user.email,
+            'user_id': user.id
+        }, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def invalid_credentials():
+        return Response({'non_field_errors': ["Invalid credentials."]}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,8 +1,14 @@
 from django.urls import reverse 
+from django.contrib.auth.hashers import get_hasher
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from unittest.mock import patch
 from rest_framework.test import APITestCase
 from rest_framework import status
-from rest_framework.authtoken.models import Token
+from user.models import AuthToken
+
+from core.ratelimit import get_rate_limit_stats
 
 User = get_user_model()
 
@@ -18,6 +24,7 @@ class LoginTests(APITestCase):
         """
         Set up test users and the login URL before each test.
         """
+        cache.clear()
         self.user = User.objects.create_user(
             email='testuser@example.com',
             password='StrongPass123!',
@@ -49,7 +56,7 @@ class LoginTests(APITestCase):
         self.assertEqual(response.data['email'], self.user.email)
         self.assertEqual(response.data['user_id'], self.user.id)
 
-        token = Token.objects.filter(user=self.user).first()
+        token = AuthToken.objects.filter(user=self.user).first()
         self.assertIsNotNone(token)
         self.assertEqual(response.data['token'], token.key)
 
@@ -96,3 +103,75 @@ class LoginTests(APITestCase):
         self.assertIn('non_field_errors', response.data)
         self.assertIn('Email not confirmed.',
                       response.data['non_field_errors'])
+
+    def test_login_upgrades_outdated_hash(self):
+        """
+        Test that a correct password stored with outdated hasher settings
+        is re-hashed with the current default hasher on login.
+        """
+        hasher = get_hasher('default')
+        self.user.password = hasher.encode('StrongPass123!', hasher.salt(), iterations=1000)
+        self.user.save(update_fields=['password'])
+
+        response = self.client.post(self.login_url, {
+            'email': 'testuser@example.com',
+            'password': 'StrongPass123!'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertFalse(hasher.must_update(self.user.password))
+        self.assertTrue(self.user.check_password('StrongPass123!'))
+
+    @override_settings(RATE_LIMITS={'login': {'ip': '100/min', 'email': '2/min'}})
+    def test_login_rate_limited_per_email(self):
+        """
+        Test that attempts over the email limit are rejected with 429 and
+        Retry-After before the password is checked, and counted.
+        """
+        data = {
+            'email': 'TestUser@example.com',
+            'password': 'WrongPassword'
+        }
+        for _ in range(2):
+            self.assertEqual(self.client.post(self.login_url, data).status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('login.api.views.acheck_password') as check:
+            response = self.client.post(self.login_url, {**data, 'email': 'testuser@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        check.assert_not_called()
+        self.assertEqual(get_rate_limit_stats(), {'login:email': 1})
+
+        other = self.client.post(self.login_url, {'email': 'inactive@example.com', 'password': 'StrongPass123!'})
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RATE_LIMITS={'login': {'ip': '2/min'}})
+    def test_login_ip_limit_ignores_forwarded_for(self):
+        """
+        Test that a client cannot reset its IP limit by sending a different
+        X-Forwarded-For header with every request.
+        """
+        data = {'email': 'testuser@example.com', 'password': 'WrongPassword'}
+        statuses = [
+            self.client.post(self.login_url, data, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [status.HTTP_400_BAD_REQUEST] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS])
+
+    def test_login_issues_one_expiring_token_per_device(self):
+        """
+        Test that logging in again from the same device replaces its token,
+        while another device gets a token of its own.
+        """
+        data = {'email': 'testuser@example.com', 'password': 'StrongPass123!'}
+        first = self.client.post(self.login_url, {**data, 'device': 'phone'})
+        second = self.client.post(self.login_url, {**data, 'device': 'phone'})
+        other = self.client.post(self.login_url, data, HTTP_USER_AGENT='Browser')
+
+        self.assertIn('expires_at', first.data)
+        self.assertNotEqual(first.data['token'], second.data['token'])
+        self.assertEqual(
+            set(AuthToken.objects.filter(user=self.user).values_list('key', 'device')),
+            {(second.data['token'], 'phone'), (other.data['token'], 'Browser')},
+        )
@@ -1,11 +1,12 @@
 import logging
-from django.core.mail import send_mail
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.conf import settings
 
+from core.mail import queue_mail
+
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -31,7 +32,7 @@ def send_password_reset_email(email, request):
         return
 
     try:
-        user = User.objects.get(email__iexact=email)
+        user = User.objects.get_by_email(email)
         if not user.is_active:
             logger.warning("Benutzer nicht aktiv: %s", email)
             return
@@ -41,17 +42,16 @@ def send_password_reset_email(email, request):
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         reset_link = f"{settings.FRONTEND_URL}/password-reset/{uid}/{token}"
 
-        send_mail(
+        queue_mail(
             subject="Passwort zurücksetzen",
-            message=(
+            body=(
                 f"Hier ist dein Link zum Zurücksetzen des Passworts:\n\n{reset_link}\n\n"
                 f"Falls du das nicht angefordert hast, ignoriere diese Mail."
             ),
+            to=[email],
             from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
         )
-        logger.info("Passwort-Zurücksetzungslink an %s gesendet.", email)
+        logger.info("Passwort-Zurücksetzungslink an %s eingereiht.", email)
 
     except User.DoesNotExist:
         logger.warning("Kein Benutzer gefunden mit E-Mail: %s", email)
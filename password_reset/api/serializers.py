@@ -56,14 +56,18 @@ class SetNewPasswordSerializer(serializers.Serializer):
         data["user"] = user
         return data
 
-    def save(self):
+    def save(self, password_hash=None):
         """
         Saves the new password for the validated user.
 
+        Args:
+            password_hash (str, optional): The new password, already hashed
+                (see `core.hashing.amake_password`). Hashed here if omitted.
+
         Returns:
             User: The updated user instance with the new password.
         """
         user = self.validated_data["user"]
-        user.password = make_password(self.validated_data["new_password"])
+        user.password = password_hash or make_password(self.validated_data["new_password"])
         user.save()
         return user
@@ -1,26 +1,31 @@
-from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 
+from core.async_views import AsyncAPIView
+from core.hashing import amake_password
+from core.ratelimit import SlidingWindowThrottle
 from .serializers import SetNewPasswordSerializer
 from .functions import send_password_reset_email
 
 
-class PasswordResetRequestView(APIView):
+class PasswordResetRequestView(AsyncAPIView):
     """
     API view to initiate a password reset request.
 
     Accepts an email address and sends a password reset link to the user if the account exists
-    and is active.
+    and is active. Requests over the `password_reset` rate limits are rejected with 429.
 
     Methods:
         post(request): Handles the password reset email request.
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    rate_limit_scope = 'password_reset'
 
-    def post(self, request):
+    async def post(self, request):
         """
         Handles the POST request to send a password reset email.
 
@@ -31,24 +36,27 @@ class PasswordResetRequestView(APIView):
             Response: A message indicating that the reset email has been sent.
         """
         email = request.data.get("email")
-        send_password_reset_email(email, request)
+        await sync_to_async(send_password_reset_email)(email, request)
         return Response({"detail": "Folge dem Link in der Email zum Zurücksetzen des Passwortes."}, status=status.HTTP_200_OK)
 
 
-class PasswordResetConfirmView(APIView):
+class PasswordResetConfirmView(AsyncAPIView):
     """
     API view to confirm and complete the password reset process.
 
     Accepts a password reset token and new password information, verifies the token, and
-    updates the user's password.
+    updates the user's password. The new password is hashed on the bounded
+    hashing pool (see `core.hashing`).
 
     Methods:
         post(request): Validates and sets the new password.
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    rate_limit_scope = 'password_reset_confirm'
 
-    def post(self, request):
+    async def post(self, request):
         """
         Handles the POST request to reset the user's password.
 
@@ -59,7 +67,8 @@ class PasswordResetConfirmView(APIView):
             Response: A message confirming the password reset or validation errors.
         """
         serializer = SetNewPasswordSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
+        if await sync_to_async(serializer.is_valid)():
+            password_hash = await amake_password(serializer.validated_data["new_password"])
+            await sync_to_async(serializer.save)(password_hash=password_hash)
             return Response({"detail": "Passwort wurde erfolgreich geändert."}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -3,6 +3,7 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
@@ -22,6 +23,7 @@ class PasswordResetTests(APITestCase):
         """
         Creates active and inactive test users and sets URLs for password reset request and confirmation.
         """
+        cache.clear()
         self.user = User.objects.create_user(
             email="testuser@example.com",
             password="TestPass123!",
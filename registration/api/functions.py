@@ -1,11 +1,10 @@
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from django.urls import reverse
 from django.contrib.sites.shortcuts import get_current_site
-from email.mime.image import MIMEImage
+
+from core.mail import queue_mail
 
 
 def send_activation_email(user, request):
@@ -22,10 +21,8 @@ def send_activation_email(user, request):
         - Generates an activation token using Django's default_token_generator.
         - Constructs an activation link targeting the frontend domain with uid and token as query parameters.
         - Prepares email subject, sender, and recipient.
-        - Renders an HTML email template with context including the user and activation link.
-        - Creates a multipart email with plain text and HTML content.
-        - Attaches an inline image (logo) to the email using MIMEImage.
-        - Sends the email to the user's email address.
+        - Queues a multipart email with plain text and an HTML template, with the logo
+          as inline image; a background job renders and sends it (see `core.mail`).
     """
     uid = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
@@ -38,20 +35,15 @@ def send_activation_email(user, request):
     to = [user.email]
 
     context = {
-        "user": user,
         "activation_link": activation_link,
         "username_clean": user.username.split("_")[0],
     }
 
     text_content = f"Bitte klicke auf den folgenden Link zur Aktivierung:\n\n{activation_link}"
-    html_content = render_to_string("emails/activation_email.html", context)
-
-    msg = EmailMultiAlternatives(subject, text_content, from_email, to)
-    msg.attach_alternative(html_content, "text/html")
-
-    with open('./registration/templates/emails/Capa_1.png', 'rb') as f:
-        logo = MIMEImage(f.read())
-        logo.add_header('Content-ID', '<logo_image>')
-        msg.attach(logo)
 
-    msg.send()
+    queue_mail(
+        subject, text_content, to, from_email,
+        html_template="emails/activation_email.html",
+        context=context,
+        inline_images=[("registration/templates/emails/Capa_1.png", "logo_image")],
+    )
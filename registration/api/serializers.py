@@ -15,7 +15,8 @@ class RegisterSerializer(serializers.ModelSerializer):
         password2: Password confirmation input, write-only.
 
     Validation:
-        Ensures that 'password' and 'password2' fields match.
+        Ensures that the email is not registered yet (ignoring case) and that
+        'password' and 'password2' fields match.
 
     Creation:
         Creates a new user with the provided email and password.
@@ -32,6 +33,23 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ('email', 'username', 'password', 'password2')
 
+    def validate_email(self, value):
+        """
+        Validates that no user is registered with the email, ignoring case.
+
+        Args:
+            value (str): The email address.
+
+        Raises:
+            serializers.ValidationError: If the email is already registered.
+
+        Returns:
+            str: The email address.
+        """
+        if User.objects.email_exists(value):
+            raise serializers.ValidationError("A user with this email already exists.")
+        return value
+
     def validate(self, attrs):
         """
         Validates that both password fields match.
@@ -55,16 +73,22 @@ class RegisterSerializer(serializers.ModelSerializer):
         """
         Creates a new inactive user with the given email and password.
 
+        A `password_hash` passed to `save()` (see `core.hashing.amake_password`)
+        is stored as is instead of hashing the password here.
+
         Args:
             validated_data (dict): The validated data from input.
 
         Returns:
             User: The created User instance.
         """
+        password_hash = validated_data.get('password_hash')
         user = User.objects.create_user(
             email=validated_data['email'],
-            password=validated_data['password'],
+            password=None if password_hash else validated_data['password'],
+            is_active=False,
         )
-        user.is_active = False
-        user.save()
+        if password_hash:
+            user.password = password_hash
+            user.save(update_fields=['password'])
         return user
@@ -1,18 +1,22 @@
 from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth import get_user_model
+from asgiref.sync import sync_to_async
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 
+from core.async_views import AsyncAPIView
+from core.hashing import amake_password
+from core.ratelimit import SlidingWindowThrottle
 from .serializers import RegisterSerializer
 from .functions import send_activation_email
 
 User = get_user_model()
 
 
-class RegisterView(APIView):
+class RegisterView(AsyncAPIView):
     """
     API view to handle user registration.
 
@@ -23,14 +27,19 @@ class RegisterView(APIView):
         Accepts registration data, validates and creates a new user.
         Sends an activation email after successful registration.
         Returns a success message or an error message on failure.
+        The password is hashed on the bounded hashing pool (see `core.hashing`).
+        Requests over the `register` rate limits are rejected with 429.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    rate_limit_scope = 'register'
 
-    def post(self, request):
+    async def post(self, request):
         serializer = RegisterSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            send_activation_email(user, request)
+        if await sync_to_async(serializer.is_valid)():
+            password_hash = await amake_password(serializer.validated_data['password'])
+            user = await sync_to_async(serializer.save)(password_hash=password_hash)
+            await sync_to_async(send_activation_email)(user, request)
             return Response(
                 {"message": "Please confirm your email address."},
                 status=status.HTTP_201_CREATED
@@ -4,9 +4,14 @@ from django.contrib.auth import get_user_model
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from unittest.mock import patch
+import smtplib
 
+from core import mail as mail_queue
 from .api.serializers import RegisterSerializer
 
 User = get_user_model()
@@ -30,10 +35,11 @@ class RegistrationActivationTests(TestCase):
         """
         Set up the test client and registration URL for tests.
         """
+        cache.clear()
         self.client = APIClient()
         self.register_url = reverse('register')
 
-    @patch('registration.api.functions.EmailMultiAlternatives.send')
+    @patch('registration.api.functions.queue_mail')
     def test_register_user_success(self, mock_send_mail):
         """
         Test successful user registration and that an activation email is sent.
@@ -92,6 +98,21 @@ class RegistrationActivationTests(TestCase):
         user = User.objects.get(email="testuser2@example.com")
         self.assertNotEqual(user.username, "shouldnotaccept")
 
+    def test_register_existing_email_other_case(self):
+        """
+        Test registration fails for an email that differs from a registered one only in case.
+        """
+        User.objects.create_user(email='taken@example.com', password='pass')
+        data = {
+            "email": "Taken@Example.com",
+            "password": "StrongPass123!",
+            "password2": "StrongPass123!"
+        }
+        response = self.client.post(self.register_url, data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.data)
+        self.assertEqual(User.objects.by_email("taken@example.com").count(), 1)
+
     def test_activate_account_success(self):
         """
         Test successful activation of a user account with valid token.
@@ -165,3 +186,86 @@ class RegistrationActivationTests(TestCase):
         self.assertFalse(serializer.is_valid())
         self.assertIn("password", serializer.errors)
         self.assertEqual(serializer.errors["password"][0], "Passwords do not match.")
+
+
+class MailQueueTests(TestCase):
+    """
+    Test suite for the background mail queue used by registration.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_registration_mail_is_sent_by_job(self):
+        """
+        Test that registration only queues the activation email and the
+        delivery job sends it with the HTML part and the inline logo.
+        """
+        response = self.client.post(reverse('register'), {
+            "email": "queued@example.com",
+            "password": "StrongPass123!",
+            "password2": "StrongPass123!"
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(mail_queue.deliver_outbox(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ["queued@example.com"])
+        self.assertIn("/login?uidb64=", message.alternatives[0][0])
+        self.assertEqual(message.attachments[0]['Content-ID'], '<logo_image>')
+
+    def test_failed_mail_is_retried_with_backoff(self):
+        """
+        Test that a failed message is queued again with an increased attempt count.
+        """
+        mail_queue.queue_mail("Betreff", "Text", ["retry@example.com"])
+        with patch('core.mail._send', side_effect=smtplib.SMTPException), \
+                patch('core.mail.django_rq.get_queue') as get_queue:
+            self.assertEqual(mail_queue.deliver_outbox(), 0)
+
+        delay, func, payloads = get_queue.return_value.enqueue_in.call_args.args
+        self.assertEqual(delay.total_seconds(), settings.MAIL_RETRY_BACKOFF)
+        self.assertEqual(func, mail_queue.deliver_messages)
+        self.assertEqual(payloads[0]['attempts'], 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_broken_message_does_not_lose_its_batch(self):
+        """
+        Test that a message failing to build is retried while the rest of its
+        batch is still sent, and that nothing stays in the processing list.
+        """
+        for address in ("first@example.com", "broken@example.com", "last@example.com"):
+            mail_queue.queue_mail("Betreff", "Text", [address])
+        build_message = mail_queue.build_message
+
+        def build(payload):
+            if payload['to'] == ["broken@example.com"]:
+                raise KeyError('context')
+            return build_message(payload)
+
+        with patch('core.mail.build_message', side_effect=build), \
+                patch('core.mail.django_rq.get_queue') as get_queue:
+            self.assertEqual(mail_queue.deliver_outbox(), 2)
+
+        self.assertEqual([message.to for message in mail.outbox], [["first@example.com"], ["last@example.com"]])
+        _, _, payloads = get_queue.return_value.enqueue_in.call_args.args
+        self.assertEqual([payload['to'] for payload in payloads], [["broken@example.com"]])
+        self.assertFalse(mail_queue._redis().exists(mail_queue.PROCESSING_KEY))
+
+    def test_interrupted_batch_is_sent_by_next_job(self):
+        """
+        Test that a batch left in the processing list by a crashed job is sent
+        by the next delivery job.
+        """
+        mail_queue.queue_mail("Betreff", "Text", ["crash@example.com"])
+        with patch('core.mail.send_messages', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                mail_queue.deliver_outbox()
+        self.assertEqual(mail_queue._redis().llen(mail_queue.PROCESSING_KEY), 1)
+
+        self.assertEqual(mail_queue.deliver_outbox(), 1)
+        self.assertEqual(mail.outbox[0].to, ["crash@example.com"])
+        self.assertFalse(mail_queue._redis().exists(mail_queue.PROCESSING_KEY))
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import User, AuthToken
 from django.utils.translation import gettext_lazy as _
 
 class UserAdmin(BaseUserAdmin):
@@ -20,4 +20,12 @@ class UserAdmin(BaseUserAdmin):
          ),
     )
 
-admin.site.register(User, UserAdmin)
\ No newline at end of file
+admin.site.register(User, UserAdmin)
+
+class AuthTokenAdmin(admin.ModelAdmin):
+    list_display = ['user', 'device', 'created', 'expires_at']
+    search_fields = ['user__email', 'device']
+    raw_id_fields = ['user']
+    ordering = ['-created']
+
+admin.site.register(AuthToken, AuthTokenAdmin)
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
-from rest_framework.authtoken.models import Token
+
+from ..authentication import get_token_user_snapshot, build_user, token_expired
 
 
 class TokenSerializer(serializers.Serializer):
@@ -16,7 +18,10 @@ class TokenSerializer(serializers.Serializer):
 
     def validate(self, data):
         """
-        Validate that the provided token exists and belongs to the user with the given ID.
+        Validate that the provided token exists, has not expired and belongs to the user with the given ID.
+
+        The token is resolved from the token cache, or with a single indexed
+        lookup of the token joined with its user on a cache miss.
 
         Args:
             data (dict): Input data containing 'token' and 'ID'.
@@ -25,19 +30,48 @@ class TokenSerializer(serializers.Serializer):
             dict: The validated data with an added 'user' key referencing the token's user.
 
         Raises:
-            serializers.ValidationError: If the token does not exist or does not belong to the user ID.
+            serializers.ValidationError: If the token does not exist, has expired or does not belong to the user ID.
         """
         token_key = data.get('token')
         user_id = data.get('ID')
 
-        try:
-            token_obj = Token.objects.get(key=token_key)
-        except Token.DoesNotExist:
+        snapshot = get_token_user_snapshot(token_key)
+        if snapshot is None:
             raise serializers.ValidationError("Token does not exist")
 
-        if token_obj.user.id != user_id:
+        if token_expired(snapshot):
+            raise serializers.ValidationError("Token has expired")
+
+        if snapshot['id'] != user_id:
             raise serializers.ValidationError(
                 "Token does not belong to this user ID")
 
-        data['user'] = token_obj.user
+        data['user'] = build_user(snapshot)
         return data
+
+
+class TokenBatchSerializer(serializers.Serializer):
+    """
+    Serializer for validating many token and user ID pairs at once.
+
+    Fields:
+        tokens (list): Up to `TOKEN_VALIDATION_BATCH_MAX_SIZE` objects with 'token' and 'ID'.
+    """
+
+    tokens = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.TOKEN_VALIDATION_BATCH_MAX_SIZE,
+    )
+
+    def validate_tokens(self, value):
+        """
+        Check that every entry carries a token string and an integer user ID.
+
+        Raises:
+            serializers.ValidationError: If an entry is malformed.
+        """
+        for entry in value:
+            if not isinstance(entry.get('token'), str) or not isinstance(entry.get('ID'), int):
+                raise serializers.ValidationError("Each entry needs a 'token' string and an 'ID' integer.")
+        return value
@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .views import TokenView
+from .views import TokenView, TokenBatchView
 
 urlpatterns = [
     path('', TokenView.as_view(), name='login'),
+    path('batch/', TokenBatchView.as_view(), name='validate-token-batch'),
 ]
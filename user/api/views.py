@@ -1,8 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
 from rest_framework import status
 
-from .serializers import TokenSerializer
+from django.utils import timezone
+
+from ..authentication import get_token_user_snapshots, token_expired
+from .serializers import TokenSerializer, TokenBatchSerializer
+
 
 class TokenView(APIView):
     """
@@ -27,6 +32,42 @@ class TokenView(APIView):
         """
         serializer = TokenSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.validated_data['user']
             return Response({"success": True}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TokenBatchView(APIView):
+    """
+    API view for services to validate many token and user ID pairs in one call.
+
+    Restricted to staff users. Resolves all tokens with one cache round trip and
+    at most one database query.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        """
+        Handle POST requests with `{"tokens": [{"token": ..., "ID": ...}, ...]}`.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            Response: HTTP 200 with `{"results": [bool, ...]}` in request order
+                      (False for unknown, expired or mismatching tokens),
+                      HTTP 400 with errors if the payload is malformed.
+        """
+        serializer = TokenBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = serializer.validated_data['tokens']
+        snapshots = get_token_user_snapshots(entry['token'] for entry in entries)
+        now = timezone.now()
+        results = [
+            entry['token'] in snapshots
+            and snapshots[entry['token']]['id'] == entry['ID']
+            and not token_expired(snapshots[entry['token']], now)
+            for entry in entries
+        ]
+        return Response({"results": results}, status=status.HTTP_200_OK)
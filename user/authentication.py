@@ -0,0 +1,267 @@
+"""
+Cached token authentication.
+
+Resolving a token normally costs an `AuthToken` join `User` query on every
+request. `CachedTokenAuthentication` keeps a minimal snapshot of the token's
+user and expiry in two layers:
+
+    1. An in-process dict with a short TTL (AUTH_TOKEN_LOCAL_TTL seconds), so
+       repeated requests on one worker need no network round trip at all.
+    2. The Redis-backed default cache (AUTH_TOKEN_CACHE_TIMEOUT seconds), shared
+       by all workers.
+
+Entries are dropped when a token is deleted or its user is saved (deactivation,
+password change, ...), see `user.signals`. Other processes notice an
+invalidation after at most AUTH_TOKEN_LOCAL_TTL seconds.
+
+Expired tokens are rejected. A token in use is renewed to AUTH_TOKEN_TTL
+seconds from now once its expiry is more than AUTH_TOKEN_RENEW_INTERVAL
+seconds old, which costs one UPDATE per token and interval rather than one
+per request.
+
+Functions:
+    token_cache_key: Cache key of a token's user snapshot.
+    get_token_user_snapshot: Resolve a token key to a user snapshot, cached.
+    get_token_user_snapshots: Resolve many token keys with at most one query.
+    token_expired: Check whether a snapshot's token has expired.
+    renew_token: Push back a token's expiry if it is due.
+    invalidate_token_keys: Drop cached snapshots for the given token keys.
+    build_user: Build a user instance from a snapshot.
+
+Classes:
+    CachedTokenAuthentication: Drop-in replacement for DRF's TokenAuthentication.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import AuthToken
+
+# Fields copied into the snapshot; everything views and permissions read from request.user.
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser')
+# Token lookup columns: the expiry followed by the user's SNAPSHOT_FIELDS.
+TOKEN_FIELDS = ('expires_at', *(f'user__{field}' for field in SNAPSHOT_FIELDS))
+
+_local_cache = {}
+_local_lock = threading.Lock()
+
+
+def token_cache_key(key: str) -> str:
+    """
+    Build the cache key for a token; the raw token never ends up in Redis.
+
+    Args:
+        key (str): The token key.
+
+    Returns:
+        str: The cache key.
+    """
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def _local_get(key: str):
+    entry = _local_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, snapshot = entry
+    if expires_at < time.monotonic():
+        _local_cache.pop(key, None)
+        return None
+    return snapshot
+
+
+def _snapshot(row) -> dict:
+    expires_at, *user_values = row
+    snapshot = dict(zip(SNAPSHOT_FIELDS, user_values))
+    snapshot['expires_at'] = expires_at
+    return snapshot
+
+
+def _local_set(key: str, snapshot: dict) -> None:
+    with _local_lock:
+        if len(_local_cache) >= settings.AUTH_TOKEN_LOCAL_MAX_ENTRIES:
+            _local_cache.clear()
+        _local_cache[key] = (time.monotonic() + settings.AUTH_TOKEN_LOCAL_TTL, snapshot)
+
+
+def get_token_user_snapshot(key: str):
+    """
+    Resolve a token key to a snapshot of its user.
+
+    Looks in the in-process cache, then in Redis, then in the database.
+
+    Args:
+        key (str): The token key.
+
+    Returns:
+        dict or None: The user's `SNAPSHOT_FIELDS` plus the token's `expires_at`,
+        or None if the token does not exist.
+    """
+    snapshot = _local_get(key)
+    if snapshot is not None:
+        return snapshot
+
+    cache_key = token_cache_key(key)
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        row = AuthToken.objects.filter(key=key).values_list(*TOKEN_FIELDS).first()
+        if row is None:
+            return None
+        snapshot = _snapshot(row)
+        cache.set(cache_key, snapshot, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+    _local_set(key, snapshot)
+    return snapshot
+
+
+def get_token_user_snapshots(keys) -> dict:
+    """
+    Resolve many token keys to user snapshots.
+
+    Uses the in-process cache, one Redis round trip for the rest and at most
+    one database query for tokens that are not cached anywhere.
+
+    Args:
+        keys (iterable): Token keys.
+
+    Returns:
+        dict: Mapping of token key to snapshot; unknown tokens are omitted.
+    """
+    snapshots = {}
+    missing = []
+    for key in set(keys):
+        snapshot = _local_get(key)
+        if snapshot is None:
+            missing.append(key)
+        else:
+            snapshots[key] = snapshot
+    if not missing:
+        return snapshots
+
+    cache_keys = {token_cache_key(key): key for key in missing}
+    cached = {cache_keys[cache_key]: snapshot for cache_key, snapshot in cache.get_many(cache_keys).items()}
+    uncached = [key for key in missing if key not in cached]
+    if uncached:
+        loaded = {
+            key: _snapshot(row)
+            for key, *row in AuthToken.objects.filter(key__in=uncached).values_list('key', *TOKEN_FIELDS)
+        }
+        cache.set_many(
+            {token_cache_key(key): snapshot for key, snapshot in loaded.items()},
+            settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+        cached.update(loaded)
+
+    for key, snapshot in cached.items():
+        _local_set(key, snapshot)
+    snapshots.update(cached)
+    return snapshots
+
+
+def token_expired(snapshot: dict, now=None) -> bool:
+    """
+    Check whether the token of a snapshot has expired.
+
+    Args:
+        snapshot (dict): A snapshot from `get_token_user_snapshot`.
+        now (datetime, optional): The current time.
+
+    Returns:
+        bool: True if the token is no longer valid.
+    """
+    return snapshot['expires_at'] <= (now or timezone.now())
+
+
+def renew_token(key: str, snapshot: dict, now=None) -> dict:
+    """
+    Push back a token's expiry to `AUTH_TOKEN_TTL` seconds from now, at most
+    once per `AUTH_TOKEN_RENEW_INTERVAL` seconds.
+
+    Args:
+        key (str): The token key.
+        snapshot (dict): The token's current snapshot.
+        now (datetime, optional): The current time.
+
+    Returns:
+        dict: The snapshot, updated if the token was renewed.
+    """
+    now = now or timezone.now()
+    ttl = timedelta(seconds=settings.AUTH_TOKEN_TTL)
+    if snapshot['expires_at'] - now > ttl - timedelta(seconds=settings.AUTH_TOKEN_RENEW_INTERVAL):
+        return snapshot
+
+    snapshot = {**snapshot, 'expires_at': now + ttl}
+    AuthToken.objects.filter(key=key).update(expires_at=snapshot['expires_at'])
+    cache.set(token_cache_key(key), snapshot, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+    _local_set(key, snapshot)
+    return snapshot
+
+
+def invalidate_token_keys(keys) -> None:
+    """
+    Drop the cached snapshots of the given tokens from Redis and this process.
+
+    Args:
+        keys (iterable): Token keys.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    with _local_lock:
+        for key in keys:
+            _local_cache.pop(key, None)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+def build_user(snapshot: dict):
+    """
+    Build a user instance from a snapshot without querying the database.
+
+    The instance is created like a `.only(*SNAPSHOT_FIELDS)` result: it can be
+    used in queries (`filter(user=request.user)`), other fields are loaded
+    lazily on access and `save()` only writes the loaded fields.
+
+    Args:
+        snapshot (dict): The user's `SNAPSHOT_FIELDS`.
+
+    Returns:
+        User: The user instance.
+    """
+    model = get_user_model()
+    # from_db expects the loaded fields in model field order.
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in snapshot]
+    return model.from_db('default', names, [snapshot[name] for name in names])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that resolves `AuthToken`s from a two-level cache
+    instead of querying `AuthToken` and `User` on every request, rejects
+    expired tokens and renews tokens in use.
+
+    `request.user` is a minimal user instance holding `SNAPSHOT_FIELDS`;
+    `request.auth` is an unsaved `AuthToken` with the key, user and expiry.
+    """
+
+    def authenticate_credentials(self, key):
+        snapshot = get_token_user_snapshot(key)
+        if snapshot is None:
+            raise AuthenticationFailed('Invalid token.')
+        now = timezone.now()
+        if token_expired(snapshot, now):
+            raise AuthenticationFailed('Token expired.')
+        if not snapshot['is_active']:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        snapshot = renew_token(key, snapshot, now)
+        user = build_user(snapshot)
+        return (user, AuthToken(key=key, user=user, expires_at=snapshot['expires_at']))
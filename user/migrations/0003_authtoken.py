@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:29
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_legacy_tokens(apps, schema_editor):
+    # Existing sessions keep working: every DRF token becomes an AuthToken
+    # valid for one full lifetime from now.
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('user', 'AuthToken')
+    expires_at = timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+    AuthToken.objects.bulk_create(
+        [AuthToken(key=key, user_id=user_id, expires_at=expires_at)
+         for key, user_id in Token.objects.values_list('key', 'user_id').iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_email_upper_unique'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('device', models.CharField(blank=True, max_length=100)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'device'], name='authtoken_user_device_idx')],
+            },
+        ),
+        migrations.RunPython(copy_legacy_tokens, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,57 @@
+import binascii
+import os
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 
 class UserManager(BaseUserManager):
     """
     Custom user manager to handle user creation with email as unique identifier.
+
+    Emails are unique regardless of case. Look users up by email through
+    `get_by_email` / `aget_by_email` / `email_exists`, which compare
+    `UPPER(email)` and are served by the `user_email_upper_unique` index.
     """
 
+    def by_email(self, email):
+        """
+        Filter users by email, ignoring case.
+
+        Args:
+            email (str): The email address.
+
+        Returns:
+            QuerySet: Users whose email matches.
+        """
+        # Compiles to UPPER(email::text) = UPPER(%s), the indexed expression.
+        return self.filter(email__iexact=email)
+
+    def get_by_email(self, email):
+        """
+        Return the user with the given email, ignoring case.
+
+        Raises:
+            User.DoesNotExist: If there is no such user.
+        """
+        return self.by_email(email).get()
+
+    async def aget_by_email(self, email):
+        """
+        Async version of `get_by_email`.
+        """
+        return await self.by_email(email).aget()
+
+    def email_exists(self, email) -> bool:
+        """
+        Check whether a user with the given email exists, ignoring case.
+        """
+        return self.by_email(email).exists()
+
     def create_user(self, email, username=None, password=None, **extra_fields):
         """
         Create and save a regular user with the given email and password.
@@ -73,7 +117,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     Attributes:
         username (str): Unique username.
-        email (str): Unique email address.
+        email (str): Email address, unique regardless of case.
         first_name (str): Optional first name.
         last_name (str): Optional last name.
         is_active (bool): Designates whether this user should be treated as active.
@@ -81,7 +125,7 @@ class User(AbstractBaseUser, PermissionsMixin):
         date_joined (datetime): Timestamp of when the user joined.
     """
     username = models.CharField(max_length=150, unique=True)
-    email = models.EmailField(unique=True)
+    email = models.EmailField()
     first_name = models.CharField(max_length=30, blank=True)
     last_name = models.CharField(max_length=30, blank=True)
     is_active = models.BooleanField(default=False)
@@ -93,6 +137,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email']
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                Upper('email'),
+                name='user_email_upper_unique',
+                violation_error_message='A user with this email already exists.',
+            ),
+        ]
+
     def __str__(self):
         """
         Return string representation of the user.
@@ -101,3 +154,83 @@ class User(AbstractBaseUser, PermissionsMixin):
             str: Email address of the user.
         """
         return self.email
+
+
+class AuthTokenManager(models.Manager):
+    """
+    Manager issuing expiring authentication tokens.
+    """
+
+    def issue(self, user, device=''):
+        """
+        Issue a new token for a user's device.
+
+        Tokens previously issued for the same device are deleted (rotation),
+        so each device holds at most one token while a user can be logged in
+        on several devices at once.
+
+        Args:
+            user (User): The user to issue the token for.
+            device (str, optional): Name of the client device.
+
+        Returns:
+            AuthToken: The new token, valid for `AUTH_TOKEN_TTL` seconds.
+        """
+        from .tasks import schedule_token_pruning
+
+        device = device[:AuthToken._meta.get_field('device').max_length]
+        with transaction.atomic():
+            self.filter(user=user, device=device).delete()
+            token = self.create(
+                user=user,
+                device=device,
+                expires_at=timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL),
+            )
+        schedule_token_pruning()
+        return token
+
+
+class AuthToken(models.Model):
+    """
+    Authentication token with an expiry date, one per user and device.
+
+    The expiry is pushed back on use (sliding renewal, see
+    `user.authentication`) and expired tokens are deleted by the
+    `tasks.prune_expired_tokens` job.
+
+    Attributes:
+        key (str): The token sent in the `Authorization: Token <key>` header.
+        user (User): The token's user.
+        device (str): Name of the client device, may be empty.
+        created (datetime): When the token was issued.
+        expires_at (datetime): When the token stops being accepted.
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='auth_tokens')
+    device = models.CharField(max_length=100, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'device'], name='authtoken_user_device_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Generate a random key for new tokens before saving.
+        """
+        if not self.key:
+            self.key = binascii.hexlify(os.urandom(20)).decode()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        """
+        Return string representation of the token.
+
+        Returns:
+            str: The token key.
+        """
+        return self.key
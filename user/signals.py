@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import invalidate_token_keys
+from .models import AuthToken
+
+
+def _invalidate(keys):
+    """
+    Drop cached token snapshots now and again once the transaction commits,
+    so a request racing the commit cannot re-cache the old state.
+    """
+    invalidate_token_keys(keys)
+    transaction.on_commit(lambda: invalidate_token_keys(keys))
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Stop accepting a token as soon as it is deleted (rotation, pruning, user deletion).
+    """
+    _invalidate([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    Refresh the cached snapshots of all tokens of a user whenever the user
+    changes, e.g. on deactivation or a password change.
+    """
+    if created:
+        return
+    _invalidate(list(AuthToken.objects.filter(user=instance).values_list('key', flat=True)))
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+from django_rq import job
+import django_rq
+
+from .authentication import invalidate_token_keys
+from .models import AuthToken
+
+PRUNE_SCHEDULED_KEY = 'auth:prune-scheduled'
+
+
+def schedule_token_pruning() -> None:
+    """
+    Queue a delayed prune job unless one was queued within the last
+    `AUTH_TOKEN_PRUNE_INTERVAL` seconds.
+
+    Called whenever a token is issued and by every prune run that emptied
+    its backlog, so pruning keeps running without a separate scheduler and
+    at most one run is pending at a time.
+    """
+    interval = settings.AUTH_TOKEN_PRUNE_INTERVAL
+    if cache.add(PRUNE_SCHEDULED_KEY, 1, interval):
+        django_rq.get_queue('default').enqueue_in(timedelta(seconds=interval), prune_expired_tokens)
+
+
+@job
+def prune_expired_tokens():
+    """
+    Background job deleting expired tokens.
+
+    Deletes at most `AUTH_TOKEN_PRUNE_BATCH_SIZE` tokens per run, so a large
+    backlog never holds long locks or occupies the worker for long; if the
+    batch was full, another run is queued right away, otherwise the next one
+    in `AUTH_TOKEN_PRUNE_INTERVAL` seconds. Requires a worker started with
+    `--with-scheduler`.
+
+    Each batch is deleted with a single statement that skips the
+    `post_delete` signal; the cached snapshots of the batch are dropped
+    together afterwards. Nothing references tokens, so no cascade is lost.
+
+    Returns:
+        int: The number of tokens deleted.
+    """
+    batch_size = settings.AUTH_TOKEN_PRUNE_BATCH_SIZE
+    keys = list(
+        AuthToken.objects.filter(expires_at__lte=timezone.now())
+        .order_by('expires_at').values_list('key', flat=True)[:batch_size]
+    )
+    if keys:
+        tokens = AuthToken.objects.filter(key__in=keys)
+        tokens._raw_delete(tokens.db)
+        invalidate_token_keys(keys)
+    if len(keys) == batch_size:
+        prune_expired_tokens.delay()
+    else:
+        schedule_token_pruning()
+    return len(keys)
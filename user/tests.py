@@ -1,6 +1,20 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.exceptions import AuthenticationFailed
+
+from user import authentication, tasks
+from user.models import AuthToken
 
 User = get_user_model()
 
@@ -96,3 +110,182 @@ class UserModelTests(TestCase):
         user = User(email='test2@example.com')
         with self.assertRaises(ValidationError):
             user.full_clean()
+
+    def test_email_lookup_ignores_case(self):
+        """
+        Test that email lookups ignore case and emails differing only in case are rejected.
+        """
+        user = User.objects.create_user(email='Case@Example.com', password='pass')
+        self.assertEqual(User.objects.get_by_email('case@example.COM'), user)
+        self.assertTrue(User.objects.email_exists('CASE@example.com'))
+
+        duplicate = User(username='duplicate', email='case@example.com')
+        with self.assertRaises(ValidationError):
+            duplicate.full_clean()
+        with self.assertRaises(IntegrityError):
+            User.objects.create_user(email='CASE@EXAMPLE.COM', password='pass')
+
+    def test_email_lookup_uses_index(self):
+        """
+        Test that email lookups are served by the UPPER(email) index.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        plan = User.objects.by_email('someone@example.com').explain()
+        self.assertIn('user_email_upper_unique', plan)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Test suite for the cached token authentication class.
+    """
+
+    def setUp(self):
+        """
+        Create an active user with a token and start with empty caches.
+        """
+        cache.clear()
+        authentication._local_cache.clear()
+        self.user = User.objects.create_user(email='cached@example.com', password='pass', is_active=True)
+        self.token = AuthToken.objects.issue(self.user)
+        self.auth = authentication.CachedTokenAuthentication()
+
+    def test_token_resolved_without_queries_once_cached(self):
+        """
+        Test that the first lookup queries the database once and later lookups,
+        also from another process (empty local cache), need no query.
+        """
+        with self.assertNumQueries(1):
+            user, auth = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(auth.key, self.token.key)
+
+        authentication._local_cache.clear()
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.email, 'cached@example.com')
+        self.assertTrue(user.is_authenticated)
+
+    def test_deactivation_and_token_deletion_invalidate_cache(self):
+        """
+        Test that deactivating the user or deleting the token takes effect immediately.
+        """
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = True
+        self.user.save()
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+
+    def test_expired_token_rejected_and_used_token_renewed(self):
+        """
+        Test that an expired token is rejected and a token whose expiry is
+        older than the renew interval gets a full lifetime again, once.
+        """
+        AuthToken.objects.filter(key=self.token.key).update(
+            expires_at=timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL - settings.AUTH_TOKEN_RENEW_INTERVAL - 60))
+        with self.assertNumQueries(2):
+            _, auth = self.auth.authenticate_credentials(self.token.key)
+        self.assertGreater(auth.expires_at, timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL - 60))
+        self.assertEqual(AuthToken.objects.get(key=self.token.key).expires_at, auth.expires_at)
+        with self.assertNumQueries(0):
+            self.auth.authenticate_credentials(self.token.key)
+
+        AuthToken.objects.filter(key=self.token.key).update(expires_at=timezone.now() - timedelta(seconds=1))
+        authentication.invalidate_token_keys([self.token.key])
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_tokens_rotate_per_device_and_expired_ones_are_pruned(self):
+        """
+        Test that issuing a token replaces only the same device's token and
+        that pruning deletes expired tokens in bounded batches.
+        """
+        phone = AuthToken.objects.issue(self.user, 'phone')
+        AuthToken.objects.issue(self.user, 'phone')
+        self.assertFalse(AuthToken.objects.filter(key=phone.key).exists())
+        self.assertEqual(self.user.auth_tokens.count(), 2)
+
+        expired = [AuthToken.objects.issue(self.user, f'old-{i}') for i in range(3)]
+        AuthToken.objects.filter(key__in=[token.key for token in expired]).update(
+            expires_at=timezone.now() - timedelta(days=1))
+        for token in expired:
+            cache.set(authentication.token_cache_key(token.key), {'user_id': self.user.pk})
+        with self.settings(AUTH_TOKEN_PRUNE_BATCH_SIZE=2), \
+                patch.object(tasks.prune_expired_tokens, 'delay') as delay, \
+                patch.object(tasks, 'schedule_token_pruning') as schedule, \
+                patch('user.signals.invalidate_token_keys') as signal_invalidation:
+            self.assertEqual(tasks.prune_expired_tokens(), 2)
+            delay.assert_called_once()
+            schedule.assert_not_called()
+            self.assertEqual(tasks.prune_expired_tokens(), 1)
+            schedule.assert_called_once()
+        signal_invalidation.assert_not_called()
+        self.assertEqual(self.user.auth_tokens.count(), 2)
+        for token in expired:
+            self.assertIsNone(cache.get(authentication.token_cache_key(token.key)))
+
+
+class TokenValidationTests(TestCase):
+    """
+    Test suite for the token validation endpoints.
+    """
+
+    def setUp(self):
+        """
+        Create two active users with tokens and start with empty caches.
+        """
+        cache.clear()
+        authentication._local_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='valid@example.com', password='pass', is_active=True)
+        self.token = AuthToken.objects.issue(self.user)
+        self.other = User.objects.create_user(email='other@example.com', password='pass', is_active=True)
+        self.other_token = AuthToken.objects.issue(self.other)
+
+    def test_validate_token_uses_one_query_then_cache(self):
+        """
+        Test that validation costs one query on a cache miss, none afterwards,
+        rejects a mismatching user ID and is not marked cacheable (POST).
+        """
+        url = reverse('login')
+        data = {'token': self.token.key, 'ID': self.user.id}
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+        with self.assertNumQueries(0):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(url, {'token': self.token.key, 'ID': self.other.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_validation_requires_staff_and_keeps_order(self):
+        """
+        Test that the batch endpoint is limited to staff and returns one result per entry.
+        """
+        url = reverse('validate-token-batch')
+        data = {'tokens': [
+            {'token': self.other_token.key, 'ID': self.other.id},
+            {'token': 'missing', 'ID': self.other.id},
+            {'token': self.other_token.key, 'ID': self.user.id},
+        ]}
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [True, False, False])
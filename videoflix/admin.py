@@ -1,4 +1,32 @@
 from django.contrib import admin
-from .models import Video
+from .models import Video, Rendition, VideoStats, VideoDailyStats
 
-admin.site.register(Video)
\ No newline at end of file
+
+class RenditionInline(admin.TabularInline):
+    model = Rendition
+    extra = 0
+    fields = ['height', 'codec', 'container', 'bitrate', 'byte_size', 'duration', 'file', 'checksum']
+
+
+@admin.register(Video)
+class VideoAdmin(admin.ModelAdmin):
+    list_display = ['title', 'genre', 'upload_date']
+    list_filter = ['genre']
+    search_fields = ['title']
+    inlines = [RenditionInline]
+
+
+@admin.register(VideoStats)
+class VideoStatsAdmin(admin.ModelAdmin):
+    list_display = ['video', 'views', 'unique_viewers', 'seconds_watched', 'updated_at']
+    list_select_related = ['video']
+    ordering = ['-views']
+    readonly_fields = ['video', 'views', 'unique_viewers', 'seconds_watched', 'completion_histogram', 'updated_at']
+
+
+@admin.register(VideoDailyStats)
+class VideoDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['video', 'day', 'views', 'unique_viewers', 'seconds_watched']
+    list_select_related = ['video']
+    date_hierarchy = 'day'
+    readonly_fields = ['video', 'day', 'views', 'unique_viewers', 'seconds_watched', 'completion_histogram']
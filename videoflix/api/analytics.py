@@ -0,0 +1,152 @@
+"""
+Incremental watch analytics.
+
+Every time progress is written to the database (by the write-behind flush or
+a batch sync) the previous and new state of each row are turned into a watch
+event. Events are applied to the `VideoStats` and `VideoDailyStats` rollups by
+a background job, so analytics never scan `VideoProgress`.
+
+Definitions:
+    view              A playback session: the first update of a viewer, or one
+                      arriving more than WATCH_SESSION_GAP seconds after the
+                      viewer's previous update.
+    unique viewer     Per video: users who ever started it. Per day: users
+                      with at least one update that day.
+    seconds watched   Forward movement of the position, capped by the elapsed
+                      recording time times WATCH_MAX_PLAYBACK_RATE so seeking
+                      ahead does not count as watching.
+    histogram         Viewers by their current position in tenths of the
+                      duration (per day: their last position that day). Only
+                      maintained for videos with a known duration.
+
+Functions:
+    build_watch_event: Describe one progress write as a watch event.
+    enqueue_watch_events: Queue events for the rollup job.
+    apply_watch_events: Apply events to the rollup tables.
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Video, VideoStats, VideoDailyStats, HISTOGRAM_BUCKETS
+
+
+def build_watch_event(video_id: int, stored, position: float, recorded_at, now) -> tuple:
+    """
+    Describe one progress write as a watch event.
+
+    Args:
+        video_id (int): ID of the video.
+        stored (tuple or None): `(position_in_seconds, client_updated_at, updated_at)`
+            of the row before the write, or None if the row is new.
+        position (float): The new position in seconds.
+        recorded_at (datetime): When the new position was recorded.
+        now (datetime): Time of the write.
+
+    Returns:
+        tuple: `(video_id, old_position, new_position, seconds_watched, new_viewer,
+        first_today, new_session)`. `old_position` is None for new rows.
+    """
+    if stored is None:
+        return (video_id, None, position, position, True, True, True)
+
+    old_position, old_recorded_at, old_updated_at = stored
+    watched = max(0.0, position - old_position)
+    if old_recorded_at is not None:
+        elapsed = max(0.0, (recorded_at - old_recorded_at).total_seconds())
+        watched = min(watched, elapsed * settings.WATCH_MAX_PLAYBACK_RATE)
+    first_today = timezone.localdate(old_updated_at) < timezone.localdate(now)
+    new_session = (now - old_updated_at).total_seconds() > settings.WATCH_SESSION_GAP
+    return (video_id, old_position, position, watched, False, first_today, new_session)
+
+
+def enqueue_watch_events(events: list) -> None:
+    """
+    Queue watch events for the rollup job, dated today.
+
+    Args:
+        events (list): Events built by `build_watch_event`.
+    """
+    if not events:
+        return
+    from .tasks import update_watch_stats
+
+    update_watch_stats.delay(events, timezone.localdate().isoformat())
+
+
+def _bucket(position: float, duration):
+    if not duration:
+        return None
+    return max(0, min(int(position / duration * HISTOGRAM_BUCKETS), HISTOGRAM_BUCKETS - 1))
+
+
+@transaction.atomic
+def apply_watch_events(events: list, day: str) -> None:
+    """
+    Apply watch events to the per-video and per-day rollups.
+
+    Missing rollup rows are created first; all affected rows are then locked,
+    updated in Python and written back with one bulk update per table, so the
+    cost does not depend on the number of events.
+
+    Args:
+        events (list): Events built by `build_watch_event`.
+        day (str): ISO date the events belong to.
+    """
+    day = date.fromisoformat(day)
+    video_ids = {event[0] for event in events}
+    durations = dict(Video.objects.filter(pk__in=video_ids).values_list('pk', 'duration'))
+    video_ids &= durations.keys()
+
+    # Rows are inserted and locked in video_id order, so concurrent jobs
+    # touching overlapping videos wait for each other instead of deadlocking.
+    ordered_ids = sorted(video_ids)
+    VideoStats.objects.bulk_create(
+        [VideoStats(video_id=video_id) for video_id in ordered_ids], ignore_conflicts=True)
+    VideoDailyStats.objects.bulk_create(
+        [VideoDailyStats(video_id=video_id, day=day) for video_id in ordered_ids], ignore_conflicts=True)
+    totals = {
+        stats.video_id: stats
+        for stats in VideoStats.objects.select_for_update().filter(video_id__in=video_ids).order_by('video_id')
+    }
+    daily = {
+        stats.video_id: stats
+        for stats in VideoDailyStats.objects.select_for_update()
+        .filter(video_id__in=video_ids, day=day).order_by('video_id')
+    }
+
+    for video_id, old_position, position, watched, new_viewer, first_today, new_session in events:
+        if video_id not in totals:
+            continue
+        total, today = totals[video_id], daily[video_id]
+        total.seconds_watched += watched
+        today.seconds_watched += watched
+        if new_session:
+            total.views += 1
+            today.views += 1
+        if new_viewer:
+            total.unique_viewers += 1
+        if first_today:
+            today.unique_viewers += 1
+
+        new_bucket = _bucket(position, durations[video_id])
+        if new_bucket is None:
+            continue
+        old_bucket = None if old_position is None else _bucket(old_position, durations[video_id])
+        # Clamped, since rows written before the duration was known were never counted.
+        if old_bucket is not None:
+            total.completion_histogram[old_bucket] = max(0, total.completion_histogram[old_bucket] - 1)
+            if not first_today:
+                today.completion_histogram[old_bucket] = max(0, today.completion_histogram[old_bucket] - 1)
+        total.completion_histogram[new_bucket] += 1
+        today.completion_histogram[new_bucket] += 1
+
+    now = timezone.now()
+    for total in totals.values():
+        total.updated_at = now
+    fields = ['views', 'unique_viewers', 'seconds_watched', 'completion_histogram']
+    VideoStats.objects.bulk_update(totals.values(), fields + ['updated_at'])
+    VideoDailyStats.objects.bulk_update(daily.values(), fields)
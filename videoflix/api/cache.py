@@ -0,0 +1,133 @@
+"""
+Response caching for catalog endpoints.
+
+Cached catalog data is keyed by a global catalog version. Saving or deleting a
+Video bumps the version (see `videoflix.signals`), so every list is rebuilt on
+its next request and stale entries simply expire.
+
+Functions:
+    get_catalog_version: Return the current catalog version.
+    bump_catalog_version: Invalidate all cached catalog data.
+    cached_catalog_response: Serve a catalog body from the cache with ETag support.
+    video_detail_cache_key: Cache key of the user-independent video detail body.
+    stream_source_cache_key: Cache key of a rendition's streaming metadata.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def _initial_version():
+    """
+    Return a fresh version number that cannot collide with older cached entries.
+    """
+    return int(time.time() * 1000)
+
+
+def get_catalog_version() -> int:
+    """
+    Return the current catalog version, initializing it if missing.
+
+    Returns:
+        int: The catalog version.
+    """
+    return cache.get_or_set(CATALOG_VERSION_KEY, _initial_version, timeout=None)
+
+
+def bump_catalog_version() -> None:
+    """
+    Increment the catalog version so all cached catalog data becomes unreachable.
+    """
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+
+
+def catalog_cache_key(namespace: str, request, version: int) -> str:
+    """
+    Build the cache key for a catalog response.
+
+    The full request URL is part of the key because responses contain absolute
+    URLs and depend on query parameters (genre, cursor, page size).
+
+    Args:
+        namespace (str): Endpoint name, e.g. 'video-list'.
+        request (Request): The current request.
+        version (int): The catalog version.
+
+    Returns:
+        str: The cache key.
+    """
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'catalog:{namespace}:{version}:{url_hash}'
+
+
+def cached_catalog_response(request, namespace: str, build) -> Response:
+    """
+    Return a catalog response from the cache, building and storing it on a miss.
+
+    Sets an ETag derived from the cache key and answers with 304 Not Modified
+    when the client already holds the current body.
+
+    Args:
+        request (Request): The current request.
+        namespace (str): Endpoint name used in the cache key.
+        build (callable): Returns the response body when it is not cached.
+
+    Returns:
+        Response: The cached or freshly built response.
+    """
+    key = catalog_cache_key(namespace, request, get_catalog_version())
+    etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+    return Response(data, headers=headers)
+
+
+def video_detail_cache_key(request, video_id: int) -> str:
+    """
+    Build the cache key for the user-independent body of a video detail response.
+
+    The body contains absolute URLs, so the scheme and host are part of the key;
+    query parameters are not, since the body is shared by all resolutions.
+
+    Args:
+        request (Request): The current request.
+        video_id (int): ID of the video.
+
+    Returns:
+        str: The cache key.
+    """
+    host_hash = hashlib.md5(request.build_absolute_uri('/').encode()).hexdigest()
+    return f'catalog:video-detail:{get_catalog_version()}:{video_id}:{host_hash}'
+
+
+def stream_source_cache_key(video_id: int, resolution: str, filename: str) -> str:
+    """
+    Build the cache key for the path, size and content type of a rendition.
+
+    Args:
+        video_id (int): ID of the video.
+        resolution (str): Resolution label from the stream URL.
+        filename (str): File name from the stream URL.
+
+    Returns:
+        str: The cache key.
+    """
+    name_hash = hashlib.md5(f'{resolution}/{filename}'.encode()).hexdigest()
+    return f'catalog:stream:{get_catalog_version()}:{video_id}:{name_hash}'
@@ -1,8 +1,15 @@
+import hashlib
+import json
+import os
 import subprocess
 from PIL import Image
 from moviepy import VideoFileClip
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Cast, RowNumber
 
-from ..models import VideoProgress
+from ..models import Video, Rendition, VideoProgress
 
 
 def convert_video(input_path: str, output_path: str, resolution: int) -> None:
@@ -44,24 +51,196 @@ def generate_thumbnail(input_path: str, output_path: str) -> None:
     image.save(output_path)
 
 
+def probe_video(path: str) -> dict:
+    """
+    Read duration and overall bitrate of a media file using ffprobe.
+
+    Args:
+        path (str): Path to the media file.
+
+    Returns:
+        dict: `duration` (float, seconds) and `bitrate` (int, bits per second);
+        values are None if ffprobe does not report them.
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration,bit_rate",
+        "-of", "json",
+        path,
+    ]
+    result = subprocess.run(command, check=True, capture_output=True, text=True)
+    media_format = json.loads(result.stdout).get("format", {})
+    duration = media_format.get("duration")
+    bitrate = media_format.get("bit_rate")
+    return {
+        "duration": float(duration) if duration else None,
+        "bitrate": int(bitrate) if bitrate else None,
+    }
+
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file in chunks.
+
+    Args:
+        path (str): Path to the file.
+        chunk_size (int, optional): Bytes read per iteration. Defaults to 1 MiB.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_resolution(resolution: str):
+    """
+    Convert a resolution label such as '720p' to its height in pixels.
+
+    Args:
+        resolution (str): Resolution label.
+
+    Returns:
+        int or None: The height, or None if the label is malformed.
+    """
+    if not resolution or not resolution.endswith('p') or not resolution[:-1].isdigit():
+        return None
+    return int(resolution[:-1])
+
+
+def get_rendition(video, resolution: str):
+    """
+    Retrieve the rendition of a video at the given resolution.
+
+    Reads `video.renditions.all()`, so no query is issued when renditions
+    were prefetched. Prefers the 'h264' codec when several codecs exist.
+
+    Args:
+        video: Video model instance.
+        resolution (str): Resolution label, e.g. '720p'.
+
+    Returns:
+        Rendition or None: The matching rendition, or None if not found.
+    """
+    height = parse_resolution(resolution)
+    matches = [r for r in video.renditions.all() if r.height == height]
+    matches.sort(key=lambda r: r.codec != 'h264')
+    return matches[0] if matches else None
+
+
 def get_video_by_resolution(video, resolution: str):
     """
-    Retrieve the video file field corresponding to the given resolution.
+    Retrieve the video file corresponding to the given resolution.
+
+    Args:
+        video: Video model instance.
+        resolution (str): Resolution label ('180p', '360p', '720p', '1080p', ...).
+
+    Returns:
+        The rendition's video file, or None if not found.
+    """
+    rendition = get_rendition(video, resolution)
+    return rendition.file if rendition else None
+
+
+def get_stream_resolutions(video) -> list:
+    """
+    Return the resolution labels a detail response lists for a video.
+
+    Always includes the configured rendition ladder (so clients get stable keys,
+    None when missing) plus any additional heights the video has.
+
+    Args:
+        video: Video model instance, ideally with prefetched renditions.
+
+    Returns:
+        list: Resolution labels, lowest first.
+    """
+    heights = set(settings.VIDEO_RENDITION_HEIGHTS)
+    heights.update(r.height for r in video.renditions.all())
+    return [f"{height}p" for height in sorted(heights)]
+
+
+def annotate_last_position(queryset, user):
+    """
+    Annotate each video with the user's last watched position via a subquery.
+
+    Args:
+        queryset (QuerySet): A Video queryset.
+        user (User): The user whose progress is looked up.
+
+    Returns:
+        QuerySet: The queryset annotated with `last_position` (None if no progress exists).
+    """
+    progress = VideoProgress.objects.filter(user=user, video=OuterRef('pk'))
+    return queryset.annotate(last_position=Subquery(progress.values('position_in_seconds')[:1]))
+
+
+def build_video_detail_body(video, request) -> dict:
+    """
+    Build the user-independent part of a video detail response.
 
     Args:
-        video: Video model instance containing different resolution fields.
-        resolution (str): Resolution key ('180p', '360p', '720p', '1080p').
+        video: Video model instance.
+        request (Request): The current request, used to build absolute URLs.
 
     Returns:
-        The video file corresponding to the resolution or None if not found.
+        dict: Video metadata plus a `streams` mapping of resolution to stream URL
+        (None for resolutions that are not available).
     """
-    resolution_map = {
-        '180p': video.video_180p,
-        '360p': video.video_360p,
-        '720p': video.video_720p,
-        '1080p': video.video_1080p,
+    streams = {}
+    for res in get_stream_resolutions(video):
+        video_file = get_video_by_resolution(video, res)
+        if video_file:
+            filename = os.path.basename(video_file.name)
+            streams[res] = request.build_absolute_uri(f"/api/video/stream/{video.id}/{res}/{filename}/")
+        else:
+            streams[res] = None
+
+    return {
+        'id': video.id,
+        'title': video.title,
+        'description': video.description,
+        'thumbnail': request.build_absolute_uri(video.thumbnail.url) if video.thumbnail else None,
+        'genre': video.genre,
+        'streams': streams,
     }
-    return resolution_map.get(resolution)
+
+
+def get_stream_source(video_id: int, resolution: str, filename: str):
+    """
+    Look up path, size and content type of a rendition for streaming.
+
+    Picks the rendition whose file name matches `filename`, falling back to the
+    preferred codec at that resolution. Sizes come from the database; the file
+    system is only consulted for renditions written before sizes were stored.
+
+    Args:
+        video_id (int): ID of the video.
+        resolution (str): Resolution label, e.g. '720p'.
+        filename (str): File name from the stream URL.
+
+    Returns:
+        dict or None: `path`, `size` and `content_type`, or None if no rendition exists.
+    """
+    height = parse_resolution(resolution)
+    if height is None:
+        return None
+    renditions = list(Rendition.objects.filter(video_id=video_id, height=height))
+    if not renditions:
+        return None
+    renditions.sort(key=lambda r: (os.path.basename(r.file.name) != filename, r.codec != 'h264'))
+    rendition = renditions[0]
+
+    size = rendition.byte_size
+    if size is None:
+        size = os.path.getsize(rendition.file.path)
+        Rendition.objects.filter(pk=rendition.pk).update(byte_size=size)
+    return {"path": rendition.file.path, "size": size, "content_type": rendition.content_type}
 
 
 def save_video_progress(user_id: int, video_id: int, position_in_seconds: float):
@@ -101,3 +280,107 @@ def get_video_progress(user_id: int, video_id: int) -> float:
         return progress.position_in_seconds
     except VideoProgress.DoesNotExist:
         return 0.0
+
+
+def get_continue_watching(user):
+    """
+    Return the user's started, unfinished videos, most recently watched first.
+
+    Filtering and ordering run in SQL on `progress_user_recent_idx`; with the
+    pagination's `(updated_at, id) < (x, y)` cursor condition, later pages start
+    their index scan at the cursor instead of skipping earlier rows. A video
+    counts as finished once the position reaches
+    `CONTINUE_WATCHING_FINISHED_RATIO` of its duration; videos without a known
+    duration are always included.
+
+    Args:
+        user (User): The user whose progress is listed.
+
+    Returns:
+        QuerySet: VideoProgress rows as dicts with the progress `id`,
+        `updated_at`, `video_id`, `position_in_seconds` and the video's title,
+        description and thumbnail.
+    """
+    ratio = settings.CONTINUE_WATCHING_FINISHED_RATIO
+    return VideoProgress.objects.filter(
+        Q(video__duration__isnull=True) | Q(position_in_seconds__lt=F('video__duration') * ratio),
+        user=user,
+        position_in_seconds__gt=0,
+    ).values(
+        'id', 'updated_at', 'video_id', 'position_in_seconds',
+        'video__title', 'video__description', 'video__thumbnail',
+    )
+
+
+def build_search_vector() -> SearchVector:
+    """
+    Build the weighted search vector expression for videos.
+
+    Titles are weighted higher (A) than descriptions (B).
+
+    Returns:
+        SearchVector: Expression combining title and description.
+    """
+    config = settings.VIDEO_SEARCH_CONFIG
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('description', weight='B', config=config)
+    )
+
+
+def update_search_vector(video_id: int) -> None:
+    """
+    Recompute the stored search vector of a video in the database.
+
+    Args:
+        video_id (int): ID of the video.
+    """
+    Video.objects.filter(pk=video_id).update(search_vector=build_search_vector())
+
+
+def search_videos(query: str):
+    """
+    Return videos matching a full-text query, annotated with their rank.
+
+    The query uses web search syntax (quoted phrases, `or`, `-excluded`). The rank
+    is cast to double precision so it round-trips exactly through pagination cursors.
+
+    Args:
+        query (str): The user's search terms.
+
+    Returns:
+        QuerySet: Matching videos annotated with `rank`.
+    """
+    search_query = SearchQuery(query, search_type='websearch', config=settings.VIDEO_SEARCH_CONFIG)
+    return Video.objects.filter(search_vector=search_query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), search_query), output_field=FloatField())
+    )
+
+
+def get_genre_rails(per_genre: int, fields: tuple) -> dict:
+    """
+    Return the newest videos of every genre using a single window-function query.
+
+    Rows are numbered with `ROW_NUMBER() OVER (PARTITION BY genre ORDER BY
+    upload_date DESC, id DESC)` and only the first `per_genre` rows of each
+    partition are kept.
+
+    Args:
+        per_genre (int): Maximum number of videos per genre.
+        fields (tuple): Columns to fetch for each video.
+
+    Returns:
+        dict: Mapping of genre key to a list of `.values()` rows, newest first.
+    """
+    ranked = Video.objects.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('genre'),
+            order_by=[F('upload_date').desc(), F('id').desc()],
+        )
+    ).filter(row_number__lte=per_genre).order_by('genre', 'row_number').values(*fields, 'genre')
+
+    rails = {}
+    for row in ranked:
+        rails.setdefault(row['genre'], []).append(row)
+    return rails
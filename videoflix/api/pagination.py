@@ -0,0 +1,254 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Classes:
+    KeysetPagination: Paginates a queryset on a unique, stable ordering without OFFSET scans.
+    SearchPagination: Keyset pagination over search results ordered by rank.
+    ContinueWatchingPagination: Keyset pagination over a user's progress, most recent first.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class _Row(Func):
+    """
+    SQL row constructor, `(a, b, ...)`.
+    """
+    template = '(%(expressions)s)'
+
+
+class _RowComparison(Func):
+    """
+    Boolean row comparison such as `(a, b) < (x, y)`.
+
+    Postgres compares rows lexicographically and can start a B-tree index scan
+    at the given row, which an equivalent OR expansion does not allow.
+    """
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+    def __init__(self, lhs, rhs, operator):
+        self.arg_joiner = f' {operator} '
+        super().__init__(lhs, rhs)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination.
+
+    The cursor encodes the ordering values of the last row of a page. The next
+    page is fetched with a `WHERE (a, b) < (x, y)` style filter instead of an
+    OFFSET, so every page costs the same index range scan as the first one.
+
+    The ordering must end in a unique field (usually `id`) to be stable.
+
+    Attributes:
+        ordering (tuple): Ordering fields, prefixed with '-' for descending order.
+        cursor_query_param (str): Query parameter carrying the encoded cursor.
+        page_size_query_param (str): Query parameter to request a page size.
+        invalid_cursor_message (str): Error message for malformed cursors.
+    """
+
+    ordering = ('-upload_date', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return one page of the ordered queryset, starting after the request's cursor.
+
+        Args:
+            queryset (QuerySet): The queryset to paginate.
+            request (Request): The current request.
+            view (APIView, optional): The calling view.
+
+        Returns:
+            list: Model instances (or dicts for `.values()` querysets) of the page.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self._build_filter(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        page = rows[:self.page_size]
+        self.next_position = self._get_position(page[-1]) if len(rows) > self.page_size else None
+        return page
+
+    def get_paginated_response(self, data):
+        """
+        Wrap serialized page data with the link to the next page.
+
+        Args:
+            data (list): Serialized rows of the current page.
+
+        Returns:
+            Response: `{"next": <url or null>, "results": [...]}`.
+        """
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        """
+        Build the paginated response body without wrapping it in a Response.
+
+        Args:
+            data (list): Serialized rows of the current page.
+
+        Returns:
+            dict: The response body.
+        """
+        return {'next': self.get_next_link(), 'results': data}
+
+    def get_page_size(self, request):
+        """
+        Return the requested page size, clamped to `VIDEO_MAX_PAGE_SIZE`.
+
+        Falls back to `VIDEO_PAGE_SIZE` when the parameter is missing or invalid.
+        """
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.VIDEO_PAGE_SIZE
+        if page_size <= 0:
+            return settings.VIDEO_PAGE_SIZE
+        return min(page_size, settings.VIDEO_MAX_PAGE_SIZE)
+
+    def get_next_link(self):
+        """
+        Return the absolute URL of the next page, or None on the last page.
+        """
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        """
+        Encode ordering values into an opaque, URL-safe cursor string.
+
+        Args:
+            position (list): Ordering values of the last row of a page.
+
+        Returns:
+            str: The encoded cursor.
+        """
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """
+        Decode the request's cursor into typed ordering values.
+
+        Args:
+            request (Request): The current request.
+            model (Model): The model being paginated, used to convert values.
+
+        Returns:
+            list or None: The ordering values, or None when no cursor was sent.
+
+        Raises:
+            NotFound: If the cursor is malformed.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            values = json.loads(raw)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [self._to_python(model, name, value) for name, value in zip(self._field_names(), values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _field_names(self):
+        """
+        Return the ordering field names without direction prefixes.
+        """
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _to_python(self, model, name, value):
+        """
+        Convert a decoded cursor value to the Python type of the model field.
+
+        Annotations that are not model fields (e.g. a search rank) must be numbers
+        and are returned as-is.
+        """
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError
+            return value
+        converted = field.to_python(value)
+        if converted is None:
+            raise ValueError
+        return converted
+
+    def _get_position(self, row):
+        """
+        Extract the ordering values from a model instance or a `.values()` dict.
+        """
+        if isinstance(row, dict):
+            return [row[name] for name in self._field_names()]
+        return [getattr(row, name) for name in self._field_names()]
+
+    def _build_filter(self, position):
+        """
+        Build the keyset condition selecting rows strictly after the given position.
+
+        When all fields are ordered in the same direction this is the row
+        comparison `(a, b, c) < (x, y, z)` (`>` for ascending), which lets the
+        index scan start at the cursor. Mixed directions are expanded to
+        `a < x OR (a = x AND b > y) ...`.
+        """
+        directions = {field.startswith('-') for field in self.ordering}
+        if len(directions) == 1:
+            return _RowComparison(
+                _Row(*[F(name) for name in self._field_names()]),
+                _Row(*[Value(value) for value in position]),
+                '<' if directions.pop() else '>',
+            )
+
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Keyset pagination for ranked search results.
+
+    Orders by the `rank` annotation first; upload date and id break ties.
+    """
+
+    ordering = ('-rank', '-upload_date', '-id')
+
+
+class ContinueWatchingPagination(KeysetPagination):
+    """
+    Keyset pagination for the continue-watching feed.
+
+    Pages VideoProgress rows by last update; matches `progress_user_recent_idx`.
+    """
+
+    ordering = ('-updated_at', '-id')
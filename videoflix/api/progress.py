@@ -0,0 +1,439 @@
+"""
+Write-behind buffer for playback progress.
+
+Progress updates arrive every few seconds per viewer. Instead of writing each
+one to Postgres, they are stored in Redis and flushed to `VideoProgress` in
+bulk by a background job (`tasks.flush_progress_buffer`).
+
+Conflicting updates are resolved last-write-wins by the time the position was
+recorded (the client's clock for batches, the server's otherwise), which is
+stored in `VideoProgress.client_updated_at`. Every database write also feeds
+the watch analytics rollups (see `analytics`).
+
+Updates are coalesced before they reach the pending hash: a heartbeat arriving
+less than PROGRESS_THROTTLE_INTERVAL seconds after the previous one is dropped,
+and a position is only queued for the database if it moved at least
+PROGRESS_MIN_DELTA seconds, PROGRESS_MAX_INTERVAL seconds have passed since the
+last queued position, or playback was paused or ended. Suppressed updates still
+refresh the read hash, so clients see their latest position.
+
+Redis layout (raw keys, shared with the default cache database):
+    progress:user:<user_id>   Hash video_id -> {"p": position, "t": unix time}.
+                              Read path; expires PROGRESS_BUFFER_TTL after the
+                              user's last update.
+    progress:last:<user_id>   Hash video_id -> "<position> <time>" of the last
+                              queued update, and "<video_id>:seen" -> time of
+                              the last update that was not throttled.
+    progress:pending          Hash "<user_id>:<video_id>" -> same payload.
+                              Updates not yet written to the database.
+    progress:flushing         The pending hash while a flush is running. It is
+                              only deleted after a successful write, so a failed
+                              flush is retried by the next one.
+    progress:flush-scheduled  Set while a flush job is queued.
+    progress:flush-lock       Held by the running flush, so two jobs never
+                              write (and count) the same updates; expires
+                              after PROGRESS_FLUSH_LOCK_TIMEOUT seconds.
+    progress:stats            Hash of counters: received, throttled,
+                              coalesced and persisted updates.
+
+Functions:
+    video_exists: Check that a video exists, cached per catalog version.
+    schedule_flush: Queue a delayed flush job unless one is already queued.
+    record_progress: Buffer a progress update and make sure a flush is queued.
+    get_progress_write_stats: Report how many progress writes were suppressed.
+    get_buffered_positions: Read a user's buffered positions.
+    merge_buffered_position: Prefer a buffered position over a stored one.
+    apply_progress_updates: Apply a batch of client updates, last write wins.
+    flush_buffered_progress: Write buffered updates to the database.
+    has_pending_progress: Check whether updates are waiting to be flushed.
+"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django_rq
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import LockError
+
+from ..models import Video, VideoProgress
+from .analytics import build_watch_event, enqueue_watch_events
+from .cache import get_catalog_version
+
+USER_KEY = 'progress:user:{user_id}'
+LAST_KEY = 'progress:last:{user_id}'
+PENDING_KEY = 'progress:pending'
+FLUSHING_KEY = 'progress:flushing'
+SCHEDULED_KEY = 'progress:flush-scheduled'
+FLUSH_LOCK_KEY = 'progress:flush-lock'
+STATS_KEY = 'progress:stats'
+
+PLAYBACK_STATES = ('playing', 'paused', 'ended')
+FORCE_PERSIST_STATES = ('paused', 'ended')
+
+# Runs the coalescing decision and all writes atomically in one round trip.
+# Returns 'throttled', 'coalesced' or 'persisted'.
+RECORD_SCRIPT = """
+local user_key, last_key, pending_key, stats_key = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local video_id, pending_field, payload = ARGV[1], ARGV[2], ARGV[3]
+local position, now = tonumber(ARGV[4]), tonumber(ARGV[5])
+local min_delta, max_interval, throttle = tonumber(ARGV[6]), tonumber(ARGV[7]), tonumber(ARGV[8])
+local force, ttl = ARGV[9] == '1', tonumber(ARGV[10])
+
+redis.call('HINCRBY', stats_key, 'received', 1)
+local seen = tonumber(redis.call('HGET', last_key, video_id .. ':seen'))
+if not force and seen and now - seen < throttle then
+    redis.call('HINCRBY', stats_key, 'throttled', 1)
+    return 'throttled'
+end
+redis.call('HSET', last_key, video_id .. ':seen', ARGV[5])
+redis.call('HSET', user_key, video_id, payload)
+redis.call('EXPIRE', user_key, ttl)
+redis.call('EXPIRE', last_key, ttl)
+
+local last = redis.call('HGET', last_key, video_id)
+if not force and last then
+    local last_position, last_time = string.match(last, '^(%S+) (%S+)$')
+    if math.abs(position - tonumber(last_position)) < min_delta
+            and now - tonumber(last_time) < max_interval then
+        redis.call('HINCRBY', stats_key, 'coalesced', 1)
+        return 'coalesced'
+    end
+end
+redis.call('HSET', last_key, video_id, ARGV[4] .. ' ' .. ARGV[5])
+redis.call('HSET', pending_key, pending_field, payload)
+redis.call('HINCRBY', stats_key, 'persisted', 1)
+return 'persisted'
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _encode(position_in_seconds: float, timestamp: float) -> str:
+    return json.dumps({'p': position_in_seconds, 't': timestamp})
+
+
+def _decode(value):
+    """
+    Return the position and the recording time (aware datetime) of a payload.
+    """
+    data = json.loads(value)
+    return data['p'], datetime.fromtimestamp(data['t'], tz=dt_timezone.utc)
+
+
+def _is_newer(recorded_at, stored_at) -> bool:
+    return stored_at is None or recorded_at >= stored_at
+
+
+def _stored_time(state):
+    """
+    Return `client_updated_at` of a stored `(position, client_updated_at, updated_at)` state.
+    """
+    return state[1] if state else None
+
+
+def video_exists(video_id: int) -> bool:
+    """
+    Check whether a video exists without querying the database on every call.
+
+    The answer is cached under the catalog version, which is bumped whenever a
+    video is created or deleted.
+
+    Args:
+        video_id (int): ID of the video.
+
+    Returns:
+        bool: True if the video exists.
+    """
+    key = f'catalog:video-exists:{get_catalog_version()}:{video_id}'
+    return cache.get_or_set(
+        key, lambda: Video.objects.filter(pk=video_id).exists(), settings.CATALOG_CACHE_TIMEOUT)
+
+
+def schedule_flush(redis=None) -> None:
+    """
+    Queue a delayed flush job unless one is already queued.
+
+    Args:
+        redis (Redis, optional): Connection to reuse.
+    """
+    from .tasks import flush_progress_buffer
+
+    redis = redis or _redis()
+    interval = settings.PROGRESS_FLUSH_INTERVAL
+    # The flag expires on its own in case a queued job is lost.
+    if redis.set(SCHEDULED_KEY, 1, nx=True, ex=interval * 10):
+        django_rq.get_queue('default').enqueue_in(timedelta(seconds=interval), flush_progress_buffer)
+
+
+def record_progress(user_id: int, video_id: int, position_in_seconds: float,
+                    timestamp: float = None, state: str = None) -> str:
+    """
+    Buffer a progress update in Redis, coalescing it with previous updates.
+
+    Args:
+        user_id (int): ID of the user.
+        video_id (int): ID of the video.
+        position_in_seconds (float): Current playback position in seconds.
+        timestamp (float, optional): Unix time of the update. Defaults to now.
+        state (str, optional): Playback state; 'paused' and 'ended' always persist.
+
+    Returns:
+        str: 'throttled', 'coalesced' or 'persisted'.
+    """
+    timestamp = timestamp or time.time()
+    redis = _redis()
+    script = redis.register_script(RECORD_SCRIPT)
+    outcome = script(
+        keys=[USER_KEY.format(user_id=user_id), LAST_KEY.format(user_id=user_id), PENDING_KEY, STATS_KEY],
+        args=[
+            video_id,
+            f'{user_id}:{video_id}',
+            _encode(position_in_seconds, timestamp),
+            repr(float(position_in_seconds)),
+            repr(float(timestamp)),
+            settings.PROGRESS_MIN_DELTA,
+            settings.PROGRESS_MAX_INTERVAL,
+            settings.PROGRESS_THROTTLE_INTERVAL,
+            1 if state in FORCE_PERSIST_STATES else 0,
+            settings.PROGRESS_BUFFER_TTL,
+        ],
+    ).decode()
+    if outcome == 'persisted':
+        schedule_flush(redis)
+    return outcome
+
+
+def get_progress_write_stats() -> dict:
+    """
+    Report how many progress updates were received and how many were suppressed.
+
+    Returns:
+        dict: `received`, `throttled`, `coalesced` and `persisted` counts plus
+        `suppression_ratio`, the share of received updates that were not queued
+        for the database (0.0 if nothing was received).
+    """
+    counters = {key.decode(): int(value) for key, value in _redis().hgetall(STATS_KEY).items()}
+    stats = {key: counters.get(key, 0) for key in ('received', 'throttled', 'coalesced', 'persisted')}
+    suppressed = stats['throttled'] + stats['coalesced']
+    stats['suppression_ratio'] = suppressed / stats['received'] if stats['received'] else 0.0
+    return stats
+
+
+def get_buffered_positions(user_id: int, video_ids=None) -> dict:
+    """
+    Read a user's buffered playback positions.
+
+    Args:
+        user_id (int): ID of the user.
+        video_ids (iterable, optional): Restrict the lookup to these videos.
+            Defaults to all buffered videos of the user.
+
+    Returns:
+        dict: Mapping of video ID to position in seconds.
+    """
+    user_key = USER_KEY.format(user_id=user_id)
+    redis = _redis()
+    if video_ids is None:
+        entries = redis.hgetall(user_key).items()
+    else:
+        video_ids = list(video_ids)
+        if not video_ids:
+            return {}
+        entries = zip(video_ids, redis.hmget(user_key, video_ids))
+    return {int(video_id): _decode(value)[0] for video_id, value in entries if value}
+
+
+def merge_buffered_position(user_id: int, video_id: int, stored_position):
+    """
+    Return the buffered position of a video if there is one, else the stored one.
+
+    Args:
+        user_id (int): ID of the user.
+        video_id (int): ID of the video.
+        stored_position (float or None): Position loaded from the database.
+
+    Returns:
+        float or None: The most recent known position.
+    """
+    return get_buffered_positions(user_id, [video_id]).get(int(video_id), stored_position)
+
+
+def apply_progress_updates(user_id: int, updates) -> dict:
+    """
+    Apply a batch of progress updates recorded by a client, last write wins.
+
+    Within the batch only the newest update per video counts. It is dropped if
+    a newer position is buffered or stored. Video IDs are validated with one
+    query, stored timestamps are read with one query and all accepted updates
+    are written with one upsert. The user's read buffer is updated as well, so
+    the batch is visible immediately.
+
+    Args:
+        user_id (int): ID of the user.
+        updates (list): Dicts with `video_id`, `position_in_seconds` and an
+            aware `client_timestamp` datetime.
+
+    Returns:
+        dict: `applied` and `stale` counts and the sorted `unknown_videos` IDs.
+    """
+    latest = {}
+    for update in updates:
+        current = latest.get(update['video_id'])
+        if current is None or update['client_timestamp'] >= current['client_timestamp']:
+            latest[update['video_id']] = update
+
+    known = set(Video.objects.filter(pk__in=latest).values_list('pk', flat=True))
+    unknown = sorted(set(latest) - known)
+    candidates = [update for video_id, update in latest.items() if video_id in known]
+    if not candidates:
+        return {'applied': 0, 'stale': 0, 'unknown_videos': unknown}
+
+    user_key = USER_KEY.format(user_id=user_id)
+    redis = _redis()
+    video_ids = [update['video_id'] for update in candidates]
+    buffered = {
+        video_id: _decode(value)[1]
+        for video_id, value in zip(video_ids, redis.hmget(user_key, video_ids)) if value
+    }
+    stored = {
+        video_id: state
+        for video_id, *state in VideoProgress.objects.filter(user_id=user_id, video_id__in=video_ids)
+        .values_list('video_id', 'position_in_seconds', 'client_updated_at', 'updated_at')
+    }
+    accepted = [
+        update for update in candidates
+        if _is_newer(update['client_timestamp'], buffered.get(update['video_id']))
+        and _is_newer(update['client_timestamp'], _stored_time(stored.get(update['video_id'])))
+    ]
+
+    if accepted:
+        now = timezone.now()
+        VideoProgress.objects.bulk_create(
+            [
+                VideoProgress(
+                    user_id=user_id,
+                    video_id=update['video_id'],
+                    position_in_seconds=update['position_in_seconds'],
+                    client_updated_at=update['client_timestamp'],
+                    updated_at=now,
+                )
+                for update in accepted
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'video'],
+            update_fields=['position_in_seconds', 'client_updated_at', 'updated_at'],
+        )
+        # Older pending entries for these videos are dropped by the next flush.
+        pipe = redis.pipeline(transaction=False)
+        pipe.hset(user_key, mapping={
+            update['video_id']: _encode(update['position_in_seconds'], update['client_timestamp'].timestamp())
+            for update in accepted
+        })
+        pipe.expire(user_key, settings.PROGRESS_BUFFER_TTL)
+        pipe.execute()
+        enqueue_watch_events([
+            build_watch_event(
+                update['video_id'], stored.get(update['video_id']),
+                update['position_in_seconds'], update['client_timestamp'], now)
+            for update in accepted
+        ])
+
+    return {'applied': len(accepted), 'stale': len(candidates) - len(accepted), 'unknown_videos': unknown}
+
+
+def flush_buffered_progress() -> int:
+    """
+    Write all pending progress updates to the database in one upsert.
+
+    Pending updates are moved aside atomically with RENAME, so updates arriving
+    during the flush are kept for the next run. Updates for users or videos that
+    no longer exist, and updates older than the stored position, are dropped.
+    Only one flush runs at a time; a job that finds another one running returns
+    without doing anything.
+
+    Returns:
+        int: The number of progress rows written.
+    """
+    redis = _redis()
+    # Updates arriving from now on queue the next flush.
+    redis.delete(SCHEDULED_KEY)
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=settings.PROGRESS_FLUSH_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        return 0
+    try:
+        return _flush(redis)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # Expired during a very long flush; another job may hold it now.
+            pass
+
+
+def _flush(redis) -> int:
+    if not redis.exists(FLUSHING_KEY):
+        if not redis.exists(PENDING_KEY):
+            return 0
+        redis.rename(PENDING_KEY, FLUSHING_KEY)
+
+    updates = {}
+    for field, value in redis.hgetall(FLUSHING_KEY).items():
+        user_id, video_id = map(int, field.split(b':'))
+        updates[user_id, video_id] = _decode(value)
+
+    user_ids = {user_id for user_id, _ in updates}
+    video_ids = {video_id for _, video_id in updates}
+    existing_users = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    existing_videos = set(Video.objects.filter(pk__in=video_ids).values_list('pk', flat=True))
+    stored = {
+        (user_id, video_id): state
+        for user_id, video_id, *state in VideoProgress.objects.filter(
+            user_id__in=user_ids, video_id__in=video_ids
+        ).values_list('user_id', 'video_id', 'position_in_seconds', 'client_updated_at', 'updated_at')
+    }
+
+    now = timezone.now()
+    rows = [
+        VideoProgress(
+            user_id=user_id,
+            video_id=video_id,
+            position_in_seconds=position,
+            client_updated_at=recorded_at,
+            updated_at=now,
+        )
+        for (user_id, video_id), (position, recorded_at) in updates.items()
+        if user_id in existing_users and video_id in existing_videos
+        and _is_newer(recorded_at, _stored_time(stored.get((user_id, video_id))))
+    ]
+    VideoProgress.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user', 'video'],
+        update_fields=['position_in_seconds', 'client_updated_at', 'updated_at'],
+    )
+    redis.delete(FLUSHING_KEY)
+    enqueue_watch_events([
+        build_watch_event(
+            row.video_id, stored.get((row.user_id, row.video_id)),
+            row.position_in_seconds, row.client_updated_at, now)
+        for row in rows
+    ])
+    return len(rows)
+
+
+def has_pending_progress() -> bool:
+    """
+    Check whether updates are waiting to be flushed.
+
+    Returns:
+        bool: True if the pending or flushing hash exists.
+    """
+    return bool(_redis().exists(PENDING_KEY, FLUSHING_KEY))
@@ -0,0 +1,153 @@
+"""
+Serializer-free projections for list endpoints.
+
+List endpoints fetch plain `.values()` rows and turn them into response dicts
+with a generated function instead of running DRF field machinery per row. The
+output is identical to the matching serializer's representation.
+
+Functions:
+    compile_projection: Generate a row-to-dict function for a fixed field list.
+    media_url_converter: Build absolute media URLs from a precomputed base URL.
+    datetime_converter: Format datetimes like DRF's DateTimeField.
+
+Classes:
+    VideoListProjection: Fast equivalent of VideoListSerializer(many=True).
+"""
+
+from functools import lru_cache
+
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from ..models import Video
+from .serializers import VideoListSerializer
+
+
+@lru_cache(maxsize=None)
+def compile_projection(fields: tuple, converted: frozenset):
+    """
+    Generate a function `project(row, converters) -> dict` for the given fields.
+
+    The function body is a single dict literal, e.g.
+    `{'id': row['id'], 'thumbnail': converters['thumbnail'](row['thumbnail'])}`,
+    so projecting a row costs one dict build and no per-field branching.
+
+    Args:
+        fields (tuple): Output keys, in response order; each is read from the row by name.
+        converted (frozenset): Fields whose raw value is passed through a converter.
+
+    Returns:
+        callable: The compiled projection function.
+    """
+    items = []
+    for name in fields:
+        if name in converted:
+            items.append(f'{name!r}: converters[{name!r}](row[{name!r}])')
+        else:
+            items.append(f'{name!r}: row[{name!r}]')
+    source = f"def project(row, converters):\n    return {{{', '.join(items)}}}\n"
+    namespace = {}
+    exec(compile(source, f'<projection {",".join(fields)}>', 'exec'), namespace)
+    return namespace['project']
+
+
+def media_url_converter(request, storage):
+    """
+    Return a converter from a stored file name to its absolute URL.
+
+    For file system storage the absolute media base URL is computed once, so
+    each row only needs a string concatenation instead of `storage.url()` plus
+    `request.build_absolute_uri()`.
+
+    Args:
+        request (Request): The current request.
+        storage (Storage): The storage of the file field.
+
+    Returns:
+        callable: Maps a file name (or empty value) to an absolute URL (or None).
+    """
+    if isinstance(storage, FileSystemStorage):
+        base_url = request.build_absolute_uri(storage.base_url)
+
+        def convert(name):
+            return base_url + filepath_to_uri(name).lstrip('/') if name else None
+    else:
+        def convert(name):
+            return request.build_absolute_uri(storage.url(name)) if name else None
+    return convert
+
+
+def datetime_converter():
+    """
+    Return a converter formatting datetimes exactly like DRF's DateTimeField.
+
+    Values are converted to the current timezone, rendered in ISO 8601 and a
+    UTC offset is written as 'Z'.
+
+    Returns:
+        callable: Maps a datetime (or None) to a string (or None).
+    """
+    tz = timezone.get_current_timezone()
+
+    def convert(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+class VideoListProjection:
+    """
+    Fast equivalent of `VideoListSerializer(rows, many=True).data`.
+
+    Usage:
+        projection = VideoListProjection(request)
+        rows = projection.values(Video.objects.all())
+        data = projection.project(rows)
+    """
+
+    fields = tuple(VideoListSerializer.Meta.fields)
+    _project = staticmethod(compile_projection(fields, frozenset({'thumbnail', 'upload_date'})))
+
+    def __init__(self, request):
+        """
+        Precompute the per-request converters.
+
+        Args:
+            request (Request): The current request, used to build absolute URLs.
+        """
+        self.converters = {
+            'thumbnail': media_url_converter(request, Video._meta.get_field('thumbnail').storage),
+            'upload_date': datetime_converter(),
+        }
+
+    def values(self, queryset, *extra_fields):
+        """
+        Restrict a queryset to the columns needed by the projection.
+
+        Args:
+            queryset (QuerySet): A Video queryset.
+            *extra_fields (str): Additional columns, e.g. annotations used for ordering.
+
+        Returns:
+            QuerySet: A `.values()` queryset yielding dicts.
+        """
+        return queryset.values(*self.fields, *extra_fields)
+
+    def project(self, rows):
+        """
+        Project `.values()` rows into response dicts.
+
+        Args:
+            rows (iterable): Dicts produced by `values()`.
+
+        Returns:
+            list: Response dicts, in row order.
+        """
+        project = self._project
+        converters = self.converters
+        return [project(row, converters) for row in rows]
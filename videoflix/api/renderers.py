@@ -0,0 +1,45 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Produces the same bytes as DRF's compact `JSONRenderer` (UTF-8, no spaces,
+    U+2028/U+2029 escaped) but serializes large lists several times faster.
+    Datetimes and other non-native types are passed to DRF's JSON encoder so
+    their representation does not change. Falls back to `JSONRenderer` when an
+    indented or ASCII-only response is requested.
+    """
+
+    options = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render `data` into JSON bytes.
+
+        Args:
+            data: The response data.
+            accepted_media_type (str, optional): The negotiated media type.
+            renderer_context (dict, optional): Context passed by the view.
+
+        Returns:
+            bytes: The rendered JSON.
+        """
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent or self.ensure_ascii or not api_settings.COMPACT_JSON:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        # Matches JSONRenderer: these separators are valid JSON but not valid JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -1,6 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from ..models import Video, VideoProgress
+from ..models import Video, VideoProgress, VideoStats, VideoDailyStats
 from .functions import get_video_by_resolution
 
 
@@ -110,8 +111,13 @@ class VideoDetailSerializer(serializers.ModelSerializer):
         Retrieve the last watched playback position in seconds for the
         authenticated user and the given video.
 
+        Uses the `last_position` annotation (see `annotate_last_position`) when
+        present to avoid a query per object.
+
         Returns 0 if no progress is recorded or user is anonymous.
         """
+        if hasattr(obj, 'last_position'):
+            return obj.last_position if obj.last_position is not None else 0
         request = self.context.get('request')
         user = request.user if request else None
         if user and user.is_authenticated:
@@ -137,3 +143,46 @@ class VideoDetailSerializer(serializers.ModelSerializer):
         if video_file and hasattr(video_file, 'url'):
             return request.build_absolute_uri(video_file.url) if request else video_file.url
         return None
+
+
+class ProgressUpdateSerializer(serializers.Serializer):
+    """
+    Serializer for a single queued progress update of a batch.
+
+    Fields:
+        video_id (int): ID of the video.
+        position_in_seconds (float): Playback position in seconds.
+        client_timestamp (datetime): Time the client recorded the position.
+    """
+    video_id = serializers.IntegerField(min_value=1)
+    position_in_seconds = serializers.FloatField(min_value=0)
+    client_timestamp = serializers.DateTimeField()
+
+
+class ProgressBatchSerializer(serializers.Serializer):
+    """
+    Serializer for a batch of progress updates.
+
+    Fields:
+        updates (list): Up to `PROGRESS_BATCH_MAX_SIZE` progress updates.
+    """
+    updates = ProgressUpdateSerializer(
+        many=True, allow_empty=False, max_length=settings.PROGRESS_BATCH_MAX_SIZE)
+
+
+class VideoStatsSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the all-time watch analytics of a video.
+    """
+    class Meta:
+        model = VideoStats
+        fields = ['views', 'unique_viewers', 'seconds_watched', 'completion_histogram', 'updated_at']
+
+
+class VideoDailyStatsSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the watch analytics of a video on one day.
+    """
+    class Meta:
+        model = VideoDailyStats
+        fields = ['day', 'views', 'unique_viewers', 'seconds_watched', 'completion_histogram']
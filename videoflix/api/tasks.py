@@ -1,47 +1,133 @@
 import os
+import time
 from django.conf import settings
-from videoflix.models import Video
+from videoflix.models import Video, Rendition
 from django_rq import job
+import django_rq
 
-from .functions import convert_video, generate_thumbnail
+from core.metrics import observe_in_worker
+from .functions import convert_video, generate_thumbnail, probe_video, file_checksum
+from .progress import flush_buffered_progress, has_pending_progress, schedule_flush
+from .analytics import apply_watch_events
 
 
-@job
+def transcode_queue(height: int) -> str:
+    """
+    Route a rendition to its transcoding queue.
+
+    Renditions up to `VIDEO_PRIORITY_MAX_HEIGHT` go to `transcode-high`, so a new
+    title becomes playable at low resolution while the larger encodes wait in
+    `transcode-bulk`.
+
+    Args:
+        height (int): Height of the rendition in pixels.
+
+    Returns:
+        str: Name of the RQ queue.
+    """
+    return 'transcode-high' if height <= settings.VIDEO_PRIORITY_MAX_HEIGHT else 'transcode-bulk'
+
+
+@job('media-light')
 def process_video(video_id):
     """
-    Background job to process an uploaded video by converting it to multiple resolutions
-    and generating a thumbnail image.
+    Background job starting the processing of an uploaded video.
 
     Args:
         video_id (int): The primary key of the Video instance to process.
 
     Process:
-        - Retrieves the Video object by ID.
-        - Extracts the original video file path and base filename.
-        - Converts the video into multiple resolutions (180p, 360p, 720p, 1080p),
-          saving each converted video file under the media directory in a resolution-specific folder.
-        - Generates a thumbnail image from the original video and saves it under the thumbnails folder.
-        - Updates the Video model instance fields for each resolution and the thumbnail path.
-        - Saves the updated Video instance.
+        - Stores the duration of the original video.
+        - Queues the thumbnail on `media-light`.
+        - Queues one `transcode_rendition` job per height of `VIDEO_RENDITION_HEIGHTS`,
+          smallest first, routed by `transcode_queue`.
+    """
+    video = Video.objects.get(id=video_id)
+    video.duration = probe_video(video.original_file.path)['duration']
+    video.save(update_fields=['duration'])
+
+    generate_video_thumbnail.delay(video_id)
+    for res in sorted(settings.VIDEO_RENDITION_HEIGHTS):
+        django_rq.get_queue(transcode_queue(res)).enqueue(transcode_rendition, video_id, res)
+
+
+def transcode_rendition(video_id, res):
+    """
+    Background job converting a video to one resolution.
+
+    The converted file is saved under the media directory in a resolution-specific
+    folder, and a Rendition row stores its size, bitrate, duration and checksum.
+
+    Args:
+        video_id (int): The primary key of the Video instance.
+        res (int): Target height in pixels.
     """
     video = Video.objects.get(id=video_id)
     input_path = video.original_file.path
     base_filename = os.path.splitext(os.path.basename(input_path))[0]
-    media_root = settings.MEDIA_ROOT
+    relative_path = f'videos/{res}p/{base_filename}_{res}p.mp4'
+    output_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    started = time.monotonic()
+    convert_video(input_path, output_path, res)
+    observe_in_worker('transcode_seconds', time.monotonic() - started, rendition=f'{res}p')
+    probe = probe_video(output_path)
+    Rendition.objects.update_or_create(
+        video=video, height=res, codec='h264',
+        defaults={
+            'container': 'mp4',
+            'file': relative_path,
+            'byte_size': os.path.getsize(output_path),
+            'bitrate': probe['bitrate'],
+            'duration': probe['duration'],
+            'checksum': file_checksum(output_path),
+        },
+    )
+
 
-    resolutions = [180, 360, 720, 1080]
-    for res in resolutions:
-        output_path = os.path.join(
-            media_root, f'videos/{res}p/{base_filename}_{res}p.mp4')
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        convert_video(input_path, output_path, res)
-        setattr(video, f'video_{res}p',
-                f'videos/{res}p/{base_filename}_{res}p.mp4')
+@job('media-light')
+def generate_video_thumbnail(video_id):
+    """
+    Background job generating the thumbnail image of a video.
 
+    Args:
+        video_id (int): The primary key of the Video instance.
+    """
+    video = Video.objects.get(id=video_id)
+    input_path = video.original_file.path
+    base_filename = os.path.splitext(os.path.basename(input_path))[0]
     thumbnail_path = os.path.join(
-        media_root, f'videos/thumbnails/{base_filename}.jpg')
+        settings.MEDIA_ROOT, f'videos/thumbnails/{base_filename}.jpg')
     os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
     generate_thumbnail(input_path, thumbnail_path)
     video.thumbnail = f'videos/thumbnails/{base_filename}.jpg'
+    video.save(update_fields=['thumbnail'])
+
+
+@job
+def flush_progress_buffer():
+    """
+    Background job writing buffered playback progress to the database.
 
-    video.save()
+    Queued by `progress.record_progress` a few seconds after the first update
+    since the last flush. Requires a worker started with `--with-scheduler`.
+
+    Returns:
+        int: The number of progress rows written.
+    """
+    written = flush_buffered_progress()
+    if has_pending_progress():
+        schedule_flush()
+    return written
+
+
+@job
+def update_watch_stats(events, day):
+    """
+    Background job applying watch events to the analytics rollups.
+
+    Args:
+        events (list): Events built by `analytics.build_watch_event`.
+        day (str): ISO date the events belong to.
+    """
+    apply_watch_events(events, day)
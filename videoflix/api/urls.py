@@ -1,12 +1,16 @@
 from django.urls import path
 
-from .views import VideoUploadView, VideoListView, VideoDetailView, VideoProgressUpdateView, VideoStreamView, ContinueWatchingView
+from .views import VideoUploadView, VideoListView, GenreRailsView, VideoSearchView, VideoDetailView, VideoProgressUpdateView, VideoProgressBatchView, VideoStreamView, ContinueWatchingView, VideoStatsView
 
 urlpatterns = [
     path('upload/', VideoUploadView.as_view(), name='video-upload'),
     path('videos/', VideoListView.as_view(), name='video-list'),
+    path('videos/rails/', GenreRailsView.as_view(), name='video-rails'),
+    path('videos/search/', VideoSearchView.as_view(), name='video-search'),
     path('video/<int:pk>/', VideoDetailView.as_view(), name='video-detail'),
+    path('video/<int:pk>/stats/', VideoStatsView.as_view(), name='video-stats'),
     path('video/progress/', VideoProgressUpdateView.as_view(), name='video-progress'),
+    path('video/progress/batch/', VideoProgressBatchView.as_view(), name='video-progress-batch'),
     path('video/continue/', ContinueWatchingView.as_view(),
          name='continue-watching'),
     path('stream/<str:pk>/<str:resolution>/<str:filename>/',
@@ -1,17 +1,34 @@
-import os
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.core.cache import cache
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.exceptions import NotFound, ValidationError
 from django.http import StreamingHttpResponse, HttpResponse, Http404
 from wsgiref.util import FileWrapper
 
-from .serializers import VideoUploadSerializer, VideoListSerializer, VideoDetailSerializer
-from ..models import Video, VideoProgress
-from .tasks import process_video
-from .functions import get_video_by_resolution
+from .serializers import (
+    VideoUploadSerializer, ProgressBatchSerializer, VideoStatsSerializer, VideoDailyStatsSerializer,
+)
+from ..models import Video, VideoProgress, VideoStats, VideoDailyStats
+from .functions import (
+    search_videos, get_genre_rails, annotate_last_position,
+    build_video_detail_body, get_stream_source, get_continue_watching, parse_resolution,
+)
+from .pagination import KeysetPagination, SearchPagination, ContinueWatchingPagination
+from .cache import cached_catalog_response, video_detail_cache_key, stream_source_cache_key
+from .projections import VideoListProjection, media_url_converter
+from .progress import (
+    video_exists, record_progress, get_buffered_positions, apply_progress_updates,
+    PLAYBACK_STATES,
+)
+from .renderers import ORJSONRenderer
+from core.metrics import STREAM_BYTES, metered_stream
 
 
 class VideoUploadView(APIView):
@@ -27,8 +44,8 @@ class VideoUploadView(APIView):
     def post(self, request):
         serializer = VideoUploadSerializer(data=request.data)
         if serializer.is_valid():
-            video = serializer.save()
-            process_video.delay(video.id)
+            # Saving the video queues its processing (see signals.trigger_processing).
+            serializer.save()
             return Response(
                 {"detail": "Video hochgeladen. Verarbeitung läuft im Hintergrund."},
                 status=status.HTTP_201_CREATED,
@@ -38,14 +55,82 @@ class VideoUploadView(APIView):
 
 class VideoListView(APIView):
     """
-    API endpoint to list all videos.
-    Returns serialized list with basic info.
+    API endpoint to list videos, newest first.
+    Returns one keyset-paginated page of videos with basic info.
+    Supports `genre`, `page_size` and `cursor` query parameters.
+    Pages are cached per catalog version and support ETag revalidation.
+    Rows are projected without serializer overhead and rendered with orjson.
     """
+    pagination_class = KeysetPagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
 
     def get(self, request):
-        videos = Video.objects.all()
-        serializer = VideoListSerializer(videos, many=True, context={"request": request})
-        return Response(serializer.data)
+        genre = request.query_params.get("genre")
+        if genre is not None and genre not in dict(Video.GENRE_CHOICES):
+            raise ValidationError({"genre": f"Unbekanntes Genre: {genre}"})
+
+        def build():
+            videos = Video.objects.all()
+            if genre:
+                videos = videos.filter(genre=genre)
+            projection = VideoListProjection(request)
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(projection.values(videos), request, view=self)
+            return paginator.get_paginated_data(projection.project(page))
+
+        return cached_catalog_response(request, "video-list", build)
+
+
+class GenreRailsView(APIView):
+    """
+    API endpoint returning the newest videos of every genre in one response.
+    Supports a `per_genre` query parameter (default `VIDEO_RAIL_SIZE`).
+    Built from a single query and cached along with the catalog.
+    """
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        try:
+            per_genre = int(request.query_params.get("per_genre", settings.VIDEO_RAIL_SIZE))
+        except ValueError:
+            raise ValidationError({"per_genre": "Muss eine Zahl sein."})
+        per_genre = max(1, min(per_genre, settings.VIDEO_MAX_PAGE_SIZE))
+
+        def build():
+            projection = VideoListProjection(request)
+            rails = get_genre_rails(per_genre, projection.fields)
+            return [
+                {
+                    "genre": genre,
+                    "label": label,
+                    "videos": projection.project(rails[genre]),
+                }
+                for genre, label in Video.GENRE_CHOICES
+                if genre in rails
+            ]
+
+        return cached_catalog_response(request, "video-rails", build)
+
+
+class VideoSearchView(APIView):
+    """
+    API endpoint for full-text search over video titles and descriptions.
+    Requires a `q` query parameter; results are ranked (title matches first)
+    and keyset-paginated like the catalog.
+    """
+    pagination_class = SearchPagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "Suchbegriff fehlt."})
+
+        projection = VideoListProjection(request)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(
+            projection.values(search_videos(query), "rank"), request, view=self)
+        return paginator.get_paginated_response(projection.project(page))
 
 
 class VideoDetailView(APIView):
@@ -53,64 +138,68 @@ class VideoDetailView(APIView):
     API endpoint to retrieve video details.
     Supports optional resolution query parameter to get specific video URL.
     Includes last watched position for authenticated users.
+
+    The user-independent body is cached per video and catalog version; the
+    user's position is merged in at response time. A cache miss costs the video
+    query (with the position annotated) plus one rendition prefetch, a hit one
+    query for the position. Buffered, not yet flushed positions take precedence.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        try:
-            video = Video.objects.get(pk=pk)
-        except Video.DoesNotExist:
-            return Response({"error": "Video not found"}, status=status.HTTP_404_NOT_FOUND)
+        cache_key = video_detail_cache_key(request, pk)
+        body = cache.get(cache_key)
+        if body is None:
+            video = annotate_last_position(
+                Video.objects.filter(pk=pk), request.user
+            ).prefetch_related("renditions").first()
+            if video is None:
+                return Response({"error": "Video not found"}, status=status.HTTP_404_NOT_FOUND)
+            body = build_video_detail_body(video, request)
+            cache.set(cache_key, body, settings.CATALOG_CACHE_TIMEOUT)
+            last_position = get_buffered_positions(request.user.id, [video.id]).get(
+                video.id, video.last_position)
+        else:
+            buffered = get_buffered_positions(request.user.id, [body["id"]])
+            if body["id"] in buffered:
+                last_position = buffered[body["id"]]
+            else:
+                last_position = VideoProgress.objects.filter(
+                    user=request.user, video_id=pk
+                ).values_list("position_in_seconds", flat=True).first()
 
-        requested_resolution = request.query_params.get("resolution")
-        resolutions = ["180p", "360p", "720p", "1080p"]
-        video_urls = {}
-
-        for res in resolutions:
-            video_file = get_video_by_resolution(video, res)
-            if video_file and hasattr(video_file, "url"):
-                filename = os.path.basename(video_file.name)
-                video_urls[f"video_{res}"] = request.build_absolute_uri(
-                    f"/api/video/stream/{video.id}/{res}/{filename}/"
-                )
+        data = {key: body[key] for key in ("id", "title", "description", "thumbnail", "genre")}
+        video_urls = {f"video_{res}": url for res, url in body["streams"].items() if url}
 
+        requested_resolution = request.query_params.get("resolution")
         if requested_resolution:
             key = f"video_{requested_resolution}"
             if key not in video_urls:
                 raise ValidationError(
                     {"resolution": f"Die Auflösung {requested_resolution} ist nicht verfügbar."}
                 )
-            data = {
-                "id": video.id,
-                "title": video.title,
-                "description": video.description,
-                "thumbnail": request.build_absolute_uri(video.thumbnail.url) if video.thumbnail else None,
-                "genre": video.genre,
-                key: video_urls[key],
-                "video_url": video_urls[key],
-                "resolution": requested_resolution,
-            }
+            data[key] = video_urls[key]
+            data["video_url"] = video_urls[key]
+            data["resolution"] = requested_resolution
         else:
             if not video_urls:
                 raise NotFound("Keine verfügbare Videoauflösung gefunden.")
 
             default_resolution_key = "video_720p" if "video_720p" in video_urls else next(iter(video_urls))
-            serializer = VideoDetailSerializer(video, context={"request": request})
-            data = serializer.data
-            data.update(video_urls)
+            data.update({f"video_{res}": url for res, url in body["streams"].items()})
             data["video_url"] = video_urls[default_resolution_key]
             data["resolution"] = default_resolution_key.replace("video_", "")
 
-        if request.user.is_authenticated:
-            progress = VideoProgress.objects.filter(user=request.user, video=video).first()
-            data["last_position"] = progress.position_in_seconds if progress else 0
-
+        data["last_position"] = last_position if last_position is not None else 0
         return Response(data)
 
 
 class VideoProgressUpdateView(APIView):
     """
     API endpoint to update the playback progress of a video for an authenticated user.
+    Updates are buffered in Redis and written to the database in bulk by
+    `tasks.flush_progress_buffer`. An optional `state` ('playing', 'paused',
+    'ended') lets pauses and ends bypass the coalescing of small moves.
     """
 
     permission_classes = [IsAuthenticated]
@@ -123,58 +212,97 @@ class VideoProgressUpdateView(APIView):
             return Response({"error": "Missing required fields."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            video = Video.objects.get(id=video_id)
-        except Video.DoesNotExist:
+            video_id = int(video_id)
+            position = float(position)
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid fields."}, status=status.HTTP_400_BAD_REQUEST)
+
+        state = request.data.get("state")
+        if state is not None and state not in PLAYBACK_STATES:
+            return Response({"error": "Invalid playback state."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not video_exists(video_id):
             return Response({"error": "Video not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        VideoProgress.objects.update_or_create(
-            user=request.user, video=video, defaults={"position_in_seconds": position}
-        )
+        record_progress(request.user.id, video_id, position, state=state)
 
         return Response({"detail": "Progress saved."}, status=status.HTTP_200_OK)
 
 
+class VideoProgressBatchView(APIView):
+    """
+    API endpoint to sync a batch of queued progress updates in one request.
+    Expects `{"updates": [{"video_id", "position_in_seconds", "client_timestamp"}, ...]}`;
+    conflicts are resolved last-write-wins by client timestamp.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ProgressBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        result = apply_progress_updates(request.user.id, serializer.validated_data["updates"])
+        return Response(result, status=status.HTTP_200_OK)
+
+
 class VideoStreamView(APIView):
     """
     API endpoint to stream video files supporting HTTP Range requests.
     Allows streaming partial content for efficient playback.
+    Path, size and content type of the rendition come from the database
+    (cached per catalog version) instead of the file system.
     """
 
     permission_classes = [AllowAny]
 
     def get(self, request, pk, resolution, filename):
         try:
-            video = Video.objects.get(pk=pk)
-        except Video.DoesNotExist:
+            video_id = int(pk)
+        except ValueError:
             raise Http404("Video not found")
 
-        video_file = get_video_by_resolution(video, resolution)
-        if not video_file or not os.path.exists(video_file.path):
-            return HttpResponse("Requested resolution not available.", status=404)
+        cache_key = stream_source_cache_key(video_id, resolution, filename)
+        source = cache.get(cache_key)
+        if source is None:
+            source = get_stream_source(video_id, resolution, filename)
+            if source is None:
+                return HttpResponse("Requested resolution not available.", status=404)
+            cache.set(cache_key, source, settings.CATALOG_CACHE_TIMEOUT)
+
+        file_path = source["path"]
+        file_size = source["size"]
+        content_type = source["content_type"]
+        rendition = f"{parse_resolution(resolution)}p"
 
-        file_path = video_file.path
-        file_size = os.path.getsize(file_path)
-        content_type = "video/mp4"
+        try:
+            video_stream = open(file_path, "rb")
+        except FileNotFoundError:
+            cache.delete(cache_key)
+            return HttpResponse("Requested resolution not available.", status=404)
 
         range_header = request.headers.get("Range", "").strip()
         if not range_header:
-            response = StreamingHttpResponse(FileWrapper(open(file_path, "rb")), content_type=content_type)
+            response = StreamingHttpResponse(
+                metered_stream(FileWrapper(video_stream), rendition), content_type=content_type)
             response["Content-Length"] = str(file_size)
             return response
 
-        try:
-            range_type, range_spec = range_header.split("=")
-            range_start, range_end = range_spec.split("-")
-            range_start = int(range_start)
-            range_end = int(range_end) if range_end else file_size - 1
-        except Exception:
-            return HttpResponse("Invalid Range Header", status=400)
-
-        length = range_end - range_start + 1
-        with open(file_path, "rb") as f:
+        with video_stream as f:
+            try:
+                range_type, range_spec = range_header.split("=")
+                range_start, range_end = range_spec.split("-")
+                range_start = int(range_start)
+                range_end = int(range_end) if range_end else file_size - 1
+            except Exception:
+                return HttpResponse("Invalid Range Header", status=400)
+
+            length = range_end - range_start + 1
             f.seek(range_start)
             data = f.read(length)
 
+        STREAM_BYTES.labels(rendition).inc(len(data))
         response = HttpResponse(data, status=206, content_type=content_type)
         response["Content-Range"] = f"bytes {range_start}-{range_end}/{file_size}"
         response["Accept-Ranges"] = "bytes"
@@ -186,22 +314,56 @@ class VideoStreamView(APIView):
 class ContinueWatchingView(APIView):
     """
     API endpoint to fetch videos the authenticated user has partially watched.
-    Returns a list of videos with current playback positions greater than zero.
+    Returns a keyset-paginated page of started, unfinished videos, most
+    recently watched first, with their playback positions.
+    Buffered positions that are not yet flushed override the stored ones.
     """
 
     permission_classes = [IsAuthenticated]
+    pagination_class = ContinueWatchingPagination
 
     def get(self, request):
-        progresses = VideoProgress.objects.filter(user=request.user).select_related("video")
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(get_continue_watching(request.user), request, view=self)
+        buffered = get_buffered_positions(request.user.id, [row["video_id"] for row in page])
+        thumbnail_url = media_url_converter(request, Video._meta.get_field("thumbnail").storage)
         videos = [
             {
-                "id": p.video.id,
-                "title": p.video.title,
-                "img": request.build_absolute_uri(p.video.thumbnail.url),
-                "description": p.video.description,
-                "position_in_seconds": p.position_in_seconds,
+                "id": row["video_id"],
+                "title": row["video__title"],
+                "img": thumbnail_url(row["video__thumbnail"]),
+                "description": row["video__description"],
+                "position_in_seconds": buffered.get(row["video_id"], row["position_in_seconds"]),
             }
-            for p in progresses
-            if p.position_in_seconds > 0
+            for row in page
         ]
-        return Response(videos)
+        return paginator.get_paginated_response(videos)
+
+
+class VideoStatsView(APIView):
+    """
+    API endpoint returning the watch analytics of a video (admins only).
+    Reads the precomputed rollups: all-time totals plus one row per day for the
+    last `days` days (default 30, at most 365).
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk):
+        try:
+            days = int(request.query_params.get("days", 30))
+        except ValueError:
+            raise ValidationError({"days": "Muss eine Zahl sein."})
+        days = max(1, min(days, 365))
+
+        if not Video.objects.filter(pk=pk).exists():
+            return Response({"error": "Video not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        totals = VideoStats.objects.filter(video_id=pk).first() or VideoStats(video_id=pk)
+        since = timezone.localdate() - timedelta(days=days - 1)
+        daily = VideoDailyStats.objects.filter(video_id=pk, day__gte=since)
+        return Response({
+            "video_id": pk,
+            "totals": VideoStatsSerializer(totals).data,
+            "daily": VideoDailyStatsSerializer(daily, many=True).data,
+        })
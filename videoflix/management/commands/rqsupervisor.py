@@ -0,0 +1,212 @@
+"""
+Supervised, autoscaling pool of RQ workers.
+
+    python manage.py rqsupervisor default --min-workers 1 --max-workers 4
+    python manage.py rqsupervisor --pool transcode-bulk
+
+Runs `rqworker` child processes for the given queues and every few seconds:
+
+    - replaces workers that exited: crashed ones and ones that retired after
+      `--max-jobs` jobs, which bounds memory growth from ffmpeg/moviepy;
+    - scales up, one worker per `--backlog` queued jobs, and by at least one
+      worker while the oldest queued job has waited longer than `--max-wait`;
+    - scales down after the pool has been larger than needed for
+      `--scale-down-delay` seconds, stopping idle workers first. Stopped
+      workers finish their current job (warm shutdown).
+
+With `--pool`, queues, bounds, `max_jobs`, `with_scheduler` and
+`worker_class` are taken from that entry of RQ_WORKER_POOLS instead of the
+command line.
+
+SIGTERM or SIGINT stops all workers the same way and then exits.
+"""
+
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from datetime import timezone as dt_timezone
+
+import django_rq
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rq import Worker
+
+
+def queue_load(queue_names) -> tuple:
+    """
+    Measure the backlog of the given queues.
+
+    Args:
+        queue_names (list): Names of RQ queues from RQ_QUEUES.
+
+    Returns:
+        tuple: `(depth, oldest_age)` — queued jobs over all queues and the
+        seconds the oldest queued job has been waiting (0.0 if none).
+    """
+    depth, oldest_age = 0, 0.0
+    now = timezone.now()
+    for name in queue_names:
+        queue = django_rq.get_queue(name)
+        depth += queue.count
+        job_ids = queue.get_job_ids(0, 0)
+        job = queue.fetch_job(job_ids[0]) if job_ids else None
+        if job is not None and job.enqueued_at is not None:
+            enqueued_at = job.enqueued_at
+            if timezone.is_naive(enqueued_at):
+                enqueued_at = enqueued_at.replace(tzinfo=dt_timezone.utc)
+            oldest_age = max(oldest_age, (now - enqueued_at).total_seconds())
+    return depth, oldest_age
+
+
+def desired_worker_count(current: int, depth: int, oldest_age: float, min_workers: int,
+                         max_workers: int, backlog: int, max_wait: float) -> int:
+    """
+    Decide how many workers the pool should have.
+
+    Args:
+        current (int): Number of running workers.
+        depth (int): Queued jobs.
+        oldest_age (float): Seconds the oldest queued job has been waiting.
+        min_workers (int): Lower bound.
+        max_workers (int): Upper bound.
+        backlog (int): Queued jobs per worker before another one is started.
+        max_wait (float): Seconds a job may wait before the pool grows regardless.
+
+    Returns:
+        int: The target number of workers, within the bounds.
+    """
+    desired = math.ceil(depth / backlog)
+    if depth and oldest_age > max_wait:
+        desired = max(desired, current + 1)
+    return max(min_workers, min(max_workers, desired))
+
+
+class Command(BaseCommand):
+    help = 'Run an autoscaling, self-healing pool of RQ workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queues', nargs='*', default=['default'], help='Queues to work on, in priority order.')
+        parser.add_argument('--pool', help='Name of a worker pool in RQ_WORKER_POOLS.')
+        parser.add_argument('--min-workers', type=int, default=settings.RQ_MIN_WORKERS)
+        parser.add_argument('--max-workers', type=int, default=settings.RQ_MAX_WORKERS)
+        parser.add_argument('--max-jobs', type=int, default=settings.RQ_WORKER_MAX_JOBS,
+                            help='Jobs after which a worker is replaced by a fresh process (0 = never).')
+        parser.add_argument('--backlog', type=int, default=settings.RQ_SCALE_UP_BACKLOG,
+                            help='Queued jobs per worker before scaling up.')
+        parser.add_argument('--max-wait', type=float, default=settings.RQ_SCALE_UP_WAIT,
+                            help='Seconds the oldest job may wait before scaling up.')
+        parser.add_argument('--scale-down-delay', type=float, default=settings.RQ_SCALE_DOWN_DELAY)
+        parser.add_argument('--interval', type=float, default=settings.RQ_SUPERVISOR_INTERVAL)
+        parser.add_argument('--with-scheduler', action='store_true',
+                            help='Run the RQ scheduler (needed for enqueue_in) in the workers.')
+        parser.add_argument('--worker-class',
+                            help="Worker class for the workers. Defaults to RQ['WORKER_CLASS'].")
+
+    def handle(self, *args, **options):
+        if options['pool']:
+            if options['pool'] not in settings.RQ_WORKER_POOLS:
+                raise CommandError(f"Unknown worker pool: {options['pool']}")
+            options.update(settings.RQ_WORKER_POOLS[options['pool']])
+        options['max_workers'] = max(options['max_workers'], options['min_workers'])
+        self.options = options
+        self.workers = {}
+        self.retiring = []
+        self.stopping = False
+        self.sequence = 0
+        self.prefix = f'{socket.gethostname()}-{os.getpid()}'
+        surplus_since = None
+
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        self.log(f"Supervising {options['min_workers']}-{options['max_workers']} worker(s) "
+                 f"for {', '.join(options['queues'])}")
+
+        while not self.stopping:
+            self.reap()
+            depth, oldest_age = queue_load(options['queues'])
+            current = len(self.workers)
+            desired = desired_worker_count(
+                current, depth, oldest_age, options['min_workers'], options['max_workers'],
+                options['backlog'], options['max_wait'],
+            )
+
+            if desired > current:
+                surplus_since = None
+                for _ in range(desired - current):
+                    self.spawn()
+            elif desired < current:
+                surplus_since = surplus_since or time.monotonic()
+                if time.monotonic() - surplus_since >= options['scale_down_delay']:
+                    self.retire(current - desired)
+                    surplus_since = None
+            else:
+                surplus_since = None
+            time.sleep(options['interval'])
+
+        self.shutdown()
+
+    def request_stop(self, signum, frame):
+        self.stopping = True
+
+    def log(self, message):
+        self.stdout.write(f'[rqsupervisor] {message}')
+
+    def spawn(self):
+        """
+        Start one `rqworker` child process.
+        """
+        self.sequence += 1
+        name = f'{self.prefix}-{self.sequence}'
+        command = [sys.executable, sys.argv[0], 'rqworker', *self.options['queues'], '--name', name]
+        if self.options['max_jobs']:
+            command += ['--max-jobs', str(self.options['max_jobs'])]
+        if self.options['with_scheduler']:
+            command.append('--with-scheduler')
+        if self.options['worker_class']:
+            command += ['--worker-class', self.options['worker_class']]
+        self.workers[name] = subprocess.Popen(command)
+        self.log(f'Started worker {name} (pid {self.workers[name].pid})')
+
+    def reap(self):
+        """
+        Forget workers that exited; the next scaling pass replaces them.
+        """
+        self.retiring = [process for process in self.retiring if process.poll() is None]
+        for name, process in list(self.workers.items()):
+            code = process.poll()
+            if code is None:
+                continue
+            del self.workers[name]
+            if code == 0:
+                self.log(f'Worker {name} retired')
+            else:
+                self.log(f'Worker {name} died with exit code {code}')
+
+    def retire(self, count):
+        """
+        Stop `count` workers, idle ones first.
+        """
+        connection = django_rq.get_connection(self.options['queues'][0])
+        idle = {worker.name for worker in Worker.all(connection=connection) if worker.get_state() == 'idle'}
+        names = sorted(self.workers, key=lambda name: (name not in idle, name))[:count]
+        for name in names:
+            # SIGTERM is a warm shutdown: the current job is finished first.
+            process = self.workers.pop(name)
+            process.send_signal(signal.SIGTERM)
+            self.retiring.append(process)
+            self.log(f'Stopping worker {name}')
+
+    def shutdown(self):
+        """
+        Stop all workers and wait for them to finish their current job.
+        """
+        self.log('Shutting down')
+        for process in self.workers.values():
+            process.send_signal(signal.SIGTERM)
+        for process in [*self.workers.values(), *self.retiring]:
+            process.wait()
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videoflix', '0002_alter_video_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-upload_date', '-id'], name='video_upload_date_id_idx'),
+        ),
+    ]
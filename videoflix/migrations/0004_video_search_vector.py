@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def populate_search_vector(apps, schema_editor):
+    Video = apps.get_model('videoflix', 'Video')
+    config = settings.VIDEO_SEARCH_CONFIG
+    Video.objects.update(
+        search_vector=SearchVector('title', weight='A', config=config)
+        + SearchVector('description', weight='B', config=config)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videoflix', '0003_video_video_upload_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='video_search_vector_idx'),
+        ),
+    ]
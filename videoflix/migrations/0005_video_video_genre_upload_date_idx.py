@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videoflix', '0004_video_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['genre', '-upload_date', '-id'], name='video_genre_upload_date_idx'),
+        ),
+    ]
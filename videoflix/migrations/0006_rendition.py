@@ -0,0 +1,71 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LEGACY_HEIGHTS = [180, 360, 720, 1080]
+
+
+def copy_resolution_fields(apps, schema_editor):
+    Video = apps.get_model('videoflix', 'Video')
+    Rendition = apps.get_model('videoflix', 'Rendition')
+    renditions = []
+    for video in Video.objects.iterator():
+        for height in LEGACY_HEIGHTS:
+            video_file = getattr(video, f'video_{height}p')
+            if not video_file:
+                continue
+            try:
+                byte_size = video_file.size
+            except OSError:
+                byte_size = None
+            renditions.append(Rendition(
+                video=video, height=height, file=video_file.name, byte_size=byte_size))
+    Rendition.objects.bulk_create(renditions, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videoflix', '0005_video_video_genre_upload_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('height', models.PositiveIntegerField()),
+                ('codec', models.CharField(default='h264', max_length=20)),
+                ('container', models.CharField(default='mp4', max_length=10)),
+                ('bitrate', models.PositiveIntegerField(blank=True, null=True)),
+                ('byte_size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('file', models.FileField(max_length=255, upload_to='videos/renditions/')),
+                ('checksum', models.CharField(blank=True, max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='videoflix.video')),
+            ],
+            options={
+                'ordering': ['height', 'codec'],
+                'constraints': [models.UniqueConstraint(fields=('video', 'height', 'codec'), name='rendition_unique_variant')],
+            },
+        ),
+        migrations.RunPython(copy_resolution_fields, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_1080p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_180p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_360p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_720p',
+        ),
+    ]
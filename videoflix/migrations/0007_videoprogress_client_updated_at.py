@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videoflix', '0006_rendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoprogress',
+            name='client_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
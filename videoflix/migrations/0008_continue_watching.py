@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def populate_duration(apps, schema_editor):
+    Video = apps.get_model('videoflix', 'Video')
+    Rendition = apps.get_model('videoflix', 'Rendition')
+    longest = Rendition.objects.filter(video=OuterRef('pk')).values('video').annotate(
+        longest=Max('duration')).values('longest')
+    Video.objects.update(duration=Subquery(longest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videoflix', '0007_videoprogress_client_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_duration, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='videoprogress',
+            index=models.Index(condition=models.Q(('position_in_seconds__gt', 0)), fields=['user', '-updated_at', '-id'], name='progress_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:07
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import videoflix.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videoflix', '0008_continue_watching'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoStats',
+            fields=[
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='videoflix.video')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+                ('seconds_watched', models.FloatField(default=0.0)),
+                ('completion_histogram', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=videoflix.models.empty_histogram, size=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'video stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='VideoDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+                ('seconds_watched', models.FloatField(default=0.0)),
+                ('completion_histogram', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=videoflix.models.empty_histogram, size=10)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='videoflix.video')),
+            ],
+            options={
+                'verbose_name_plural': 'video daily stats',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('video', 'day'), name='video_daily_stats_unique_day')],
+            },
+        ),
+    ]
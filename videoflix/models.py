@@ -2,12 +2,18 @@
 Defines the data models for videos and video playback progress.
 
 Classes:
-    Video: Represents a video with metadata, different resolution files, and genre.
+    Video: Represents a video with metadata and genre.
+    Rendition: A transcoded variant (resolution, codec, container) of a video.
     VideoProgress: Tracks the playback position of a user for a specific video.
+    VideoStats: All-time watch analytics of a video.
+    VideoDailyStats: Watch analytics of a video for one day.
 """
 
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Video(models.Model):
@@ -19,12 +25,11 @@ class Video(models.Model):
         description (TextField): A detailed description of the video content.
         original_file (FileField): The original uploaded video file.
         thumbnail (ImageField): The thumbnail image for the video.
-        video_180p (FileField): The video file at 180p resolution (optional).
-        video_360p (FileField): The video file at 360p resolution (optional).
-        video_720p (FileField): The video file at 720p resolution (optional).
-        video_1080p (FileField): The video file at 1080p resolution (optional).
         upload_date (DateTimeField): Timestamp when the video was uploaded.
         genre (CharField): The genre/category of the video, selected from predefined choices.
+        duration (FloatField): Length of the video in seconds, known once it was processed.
+        search_vector (SearchVectorField): Weighted tsvector of title and description,
+            maintained on save for full-text search.
     """
 
     title = models.CharField(max_length=255)
@@ -34,15 +39,6 @@ class Video(models.Model):
     thumbnail = models.ImageField(
         upload_to='videos/thumbnails/', max_length=255 , null=True, blank=True)
 
-    video_180p = models.FileField(
-        upload_to='videos/180p/', null=True, blank=True, max_length=255)
-    video_360p = models.FileField(
-        upload_to='videos/360p/', null=True, blank=True, max_length=255)
-    video_720p = models.FileField(
-        upload_to='videos/720p/', null=True, blank=True, max_length=255)
-    video_1080p = models.FileField(
-        upload_to='videos/1080p/', null=True, blank=True, max_length=255)
-
     upload_date = models.DateTimeField(auto_now_add=True)
 
     GENRE_CHOICES = [
@@ -59,6 +55,24 @@ class Video(models.Model):
     ]
     genre = models.CharField(max_length=50, choices=GENRE_CHOICES)
 
+    duration = models.FloatField(null=True, blank=True)
+
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        """
+        Meta options for Video model.
+
+        Indexes the catalog ordering (newest first, id as tie-breaker) used by
+        keyset pagination, the same ordering per genre used by genre lists and
+        rails, and the search vector used by full-text search.
+        """
+        indexes = [
+            models.Index(fields=['-upload_date', '-id'], name='video_upload_date_id_idx'),
+            models.Index(fields=['genre', '-upload_date', '-id'], name='video_genre_upload_date_idx'),
+            GinIndex(fields=['search_vector'], name='video_search_vector_idx'),
+        ]
+
     def __str__(self):
         """
         Returns a string representation of the Video instance.
@@ -69,6 +83,76 @@ class Video(models.Model):
         return self.title
 
 
+class Rendition(models.Model):
+    """
+    Model representing one transcoded variant of a video.
+
+    Attributes:
+        video (ForeignKey): The video this rendition belongs to.
+        height (PositiveIntegerField): Vertical resolution in pixels (e.g. 720).
+        codec (CharField): Video codec, e.g. 'h264'.
+        container (CharField): Container format, e.g. 'mp4'.
+        bitrate (PositiveIntegerField): Overall bitrate in bits per second (optional).
+        byte_size (PositiveBigIntegerField): File size in bytes (optional).
+        duration (FloatField): Duration in seconds (optional).
+        file (FileField): The transcoded video file.
+        checksum (CharField): SHA-256 hex digest of the file (optional).
+        updated_at (DateTimeField): Timestamp when the rendition was last written.
+    """
+
+    CONTENT_TYPES = {
+        'mp4': 'video/mp4',
+        'webm': 'video/webm',
+        'mkv': 'video/x-matroska',
+    }
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='renditions')
+    height = models.PositiveIntegerField()
+    codec = models.CharField(max_length=20, default='h264')
+    container = models.CharField(max_length=10, default='mp4')
+    bitrate = models.PositiveIntegerField(null=True, blank=True)
+    byte_size = models.PositiveBigIntegerField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+    file = models.FileField(upload_to='videos/renditions/', max_length=255)
+    checksum = models.CharField(max_length=64, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """
+        Meta options for Rendition model.
+
+        Allows one rendition per video, height and codec, ordered from the
+        lowest to the highest resolution.
+        """
+        ordering = ['height', 'codec']
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'height', 'codec'], name='rendition_unique_variant'),
+        ]
+
+    @property
+    def resolution(self):
+        """
+        Returns the resolution label used in URLs and responses, e.g. '720p'.
+        """
+        return f"{self.height}p"
+
+    @property
+    def content_type(self):
+        """
+        Returns the HTTP content type for the rendition's container.
+        """
+        return self.CONTENT_TYPES.get(self.container, 'application/octet-stream')
+
+    def __str__(self):
+        """
+        Returns a string representation of the Rendition instance.
+
+        Returns:
+            str: The video title, resolution and codec.
+        """
+        return f"{self.video.title} ({self.resolution} {self.codec})"
+
+
 class VideoProgress(models.Model):
     """
     Model to track the playback progress of a user for a specific video.
@@ -78,6 +162,8 @@ class VideoProgress(models.Model):
         video (ForeignKey): Reference to the video being watched.
         position_in_seconds (FloatField): The last watched position in seconds.
         updated_at (DateTimeField): Timestamp of the last progress update.
+        client_updated_at (DateTimeField): Client-side time of the stored position,
+            used to resolve conflicting updates (last write wins).
     """
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
@@ -85,14 +171,24 @@ class VideoProgress(models.Model):
     video = models.ForeignKey(Video, on_delete=models.CASCADE)
     position_in_seconds = models.FloatField(default=0.0)
     updated_at = models.DateTimeField(auto_now=True)
+    client_updated_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         """
         Meta options for VideoProgress model.
 
-        Enforces uniqueness on the combination of user and video.
+        Enforces uniqueness on the combination of user and video and indexes
+        each user's started videos, most recently watched first, for the
+        continue-watching feed.
         """
         unique_together = ('user', 'video')
+        indexes = [
+            models.Index(
+                fields=['user', '-updated_at', '-id'],
+                name='progress_user_recent_idx',
+                condition=models.Q(position_in_seconds__gt=0),
+            ),
+        ]
 
     def __str__(self):
         """
@@ -102,3 +198,95 @@ class VideoProgress(models.Model):
             str: A string indicating the user, video title, and position in seconds.
         """
         return f"{self.user.username} - {self.video.title} ({self.position_in_seconds}s)"
+
+
+HISTOGRAM_BUCKETS = 10
+
+
+def empty_histogram():
+    """
+    Returns a completion histogram with all buckets at zero.
+    """
+    return [0] * HISTOGRAM_BUCKETS
+
+
+class VideoStats(models.Model):
+    """
+    Model holding the all-time watch analytics of a video.
+
+    Maintained incrementally from progress writes (see `videoflix.api.analytics`).
+
+    Attributes:
+        video (OneToOneField): The video, also the primary key.
+        views (PositiveIntegerField): Number of playback sessions.
+        unique_viewers (PositiveIntegerField): Number of users who started the video.
+        seconds_watched (FloatField): Total seconds watched by all viewers.
+        completion_histogram (ArrayField): Viewers by current position, in tenths
+            of the duration.
+        updated_at (DateTimeField): Timestamp of the last rollup.
+    """
+
+    video = models.OneToOneField(Video, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    views = models.PositiveIntegerField(default=0)
+    unique_viewers = models.PositiveIntegerField(default=0)
+    seconds_watched = models.FloatField(default=0.0)
+    completion_histogram = ArrayField(models.PositiveIntegerField(), size=HISTOGRAM_BUCKETS, default=empty_histogram)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """
+        Meta options for VideoStats model.
+        """
+        verbose_name_plural = 'video stats'
+
+    def __str__(self):
+        """
+        Returns a string representation of the VideoStats instance.
+
+        Returns:
+            str: The video ID and its view count.
+        """
+        return f"Video {self.video_id}: {self.views} views"
+
+
+class VideoDailyStats(models.Model):
+    """
+    Model holding the watch analytics of a video for one day.
+
+    Attributes:
+        video (ForeignKey): The video.
+        day (DateField): The day, in the project's time zone.
+        views (PositiveIntegerField): Number of playback sessions started that day.
+        unique_viewers (PositiveIntegerField): Number of users who watched that day.
+        seconds_watched (FloatField): Seconds watched that day.
+        completion_histogram (ArrayField): That day's viewers by their last
+            position of the day, in tenths of the duration.
+    """
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    unique_viewers = models.PositiveIntegerField(default=0)
+    seconds_watched = models.FloatField(default=0.0)
+    completion_histogram = ArrayField(models.PositiveIntegerField(), size=HISTOGRAM_BUCKETS, default=empty_histogram)
+
+    class Meta:
+        """
+        Meta options for VideoDailyStats model.
+
+        Allows one row per video and day, newest day first.
+        """
+        verbose_name_plural = 'video daily stats'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'day'], name='video_daily_stats_unique_day'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the VideoDailyStats instance.
+
+        Returns:
+            str: The video ID, day and view count.
+        """
+        return f"Video {self.video_id} on {self.day}: {self.views} views"
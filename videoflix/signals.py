@@ -1,9 +1,33 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Video
+from .models import Video, Rendition
 from .api.tasks import process_video
+from .api.cache import bump_catalog_version
+from .api.functions import update_search_vector
 
 @receiver(post_save, sender=Video)
 def trigger_processing(sender, instance, created, **kwargs):
     if created:
         process_video.delay(instance.id)
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+@receiver(post_save, sender=Rendition)
+@receiver(post_delete, sender=Rendition)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    """
+    Bump the catalog version once the change is committed, so cached catalog
+    responses are rebuilt from the new state.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Video)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the stored search vector in sync when title or description may have changed.
+    """
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        update_search_vector(instance.id)
@@ -1,14 +1,33 @@
+import base64
 import io
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest.mock import patch
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+from rest_framework.renderers import JSONRenderer
 from rest_framework import status
 from PIL import Image
+from asgiref.sync import sync_to_async
 
-from videoflix.models import Video, VideoProgress
-from videoflix.api import functions
+from videoflix.models import Video, Rendition, VideoProgress, VideoStats, VideoDailyStats
+from videoflix.api import analytics, functions, progress, tasks
+from videoflix.api.projections import VideoListProjection
+from videoflix.api.renderers import ORJSONRenderer
+from videoflix.api.serializers import VideoListSerializer
+from videoflix.management.commands.rqsupervisor import Command, desired_worker_count, queue_load
+from user.models import AuthToken
+from core.metrics import DB_QUERIES, TRANSCODE_SECONDS, observe_job
+from core.profiling import get_profile, make_profile_token
 
 User = get_user_model()
 
@@ -41,6 +60,18 @@ def get_temp_image():
     return SimpleUploadedFile("thumbnail.jpg", tmp_file.read(), content_type="image/jpeg")
 
 
+def add_renditions(video, *heights):
+    """
+    Create one h264 rendition per given height for a video.
+
+    Args:
+        video (Video): The video the renditions belong to.
+        *heights (int): Rendition heights, e.g. 360, 720.
+    """
+    for height in heights:
+        Rendition.objects.create(video=video, height=height, file=get_temp_video_file())
+
+
 class VideoTestCase(TestCase):
     """
     TestCase class for testing video-related API endpoints and utility functions.
@@ -49,6 +80,7 @@ class VideoTestCase(TestCase):
         """
         Setup test environment including test user and authenticated API client.
         """
+        cache.clear()
         self.client = APIClient()
         self.user = User.objects.create_user(
             email='test@example.com', password='testpass')
@@ -70,6 +102,38 @@ class VideoTestCase(TestCase):
         assert 'detail' in response.data
         assert Video.objects.filter(title='Test Video').exists()
 
+    def test_video_upload_queues_processing_once(self):
+        """
+        Test that an upload queues exactly one processing job, which routes
+        small renditions to transcode-high, large ones to transcode-bulk and
+        the thumbnail to media-light.
+        """
+        with patch('videoflix.signals.process_video.delay') as delay:
+            response = self.client.post(reverse('video-upload'), {
+                'title': 'Routed Video',
+                'description': 'Kurzbeschreibung',
+                'original_file': get_temp_video_file(),
+                'genre': 'action',
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        video = Video.objects.get(title='Routed Video')
+        delay.assert_called_once_with(video.id)
+
+        with self.settings(VIDEO_RENDITION_HEIGHTS=[1080, 360, 720, 180]), \
+                patch('videoflix.api.tasks.probe_video', return_value={'duration': 12.0}), \
+                patch('videoflix.api.tasks.generate_video_thumbnail.delay') as thumbnail, \
+                patch('videoflix.api.tasks.django_rq.get_queue') as get_queue:
+            tasks.process_video(video.id)
+        thumbnail.assert_called_once_with(video.id)
+        self.assertEqual(
+            [c.args[0] for c in get_queue.call_args_list],
+            ['transcode-high', 'transcode-high', 'transcode-bulk', 'transcode-bulk'],
+        )
+        self.assertEqual(
+            [c.args[2] for c in get_queue.return_value.enqueue.call_args_list], [180, 360, 720, 1080])
+        video.refresh_from_db()
+        self.assertEqual(video.duration, 12.0)
+
     def test_video_detail_with_progress(self):
         """
         Test retrieving video details including the user's last watched position.
@@ -79,12 +143,9 @@ class VideoTestCase(TestCase):
             description='Beschreibung',
             original_file=get_temp_video_file(),
             thumbnail=get_temp_image(),
-            video_180p=get_temp_video_file(),
-            video_360p=get_temp_video_file(),
-            video_720p=get_temp_video_file(),
-            video_1080p=get_temp_video_file(),
             genre='comedy'
         )
+        add_renditions(video, 180, 360, 720, 1080)
         VideoProgress.objects.create(
             user=self.user, video=video, position_in_seconds=45.5)
 
@@ -112,21 +173,25 @@ class VideoTestCase(TestCase):
         }
         response = self.client.post(url, data, format='json')
         assert response.status_code == status.HTTP_200_OK
+        assert not VideoProgress.objects.filter(user=self.user, video=video).exists()
 
-        progress = VideoProgress.objects.get(user=self.user, video=video)
-        assert progress.position_in_seconds == 87.3
+        assert progress.flush_buffered_progress() == 1
+        saved = VideoProgress.objects.get(user=self.user, video=video)
+        assert saved.position_in_seconds == 87.3
 
     def test_get_video_by_resolution_returns_correct_field(self):
         """
         Test that the function get_video_by_resolution returns the correct video file path
-        for each supported resolution and None for unsupported resolutions.
+        for each stored rendition and None for unsupported resolutions.
         """
-        video = Video(
-            video_180p='path/to/180p.mp4',
-            video_360p='path/to/360p.mp4',
-            video_720p='path/to/720p.mp4',
-            video_1080p='path/to/1080p.mp4',
+        video = Video.objects.create(
+            title='Renditions',
+            description='Beschreibung',
+            original_file=get_temp_video_file(),
+            genre='drama'
         )
+        for height in (180, 360, 720, 1080):
+            Rendition.objects.create(video=video, height=height, file=f'path/to/{height}p.mp4')
         assert functions.get_video_by_resolution(video, '180p') == 'path/to/180p.mp4'
         assert functions.get_video_by_resolution(video, '360p') == 'path/to/360p.mp4'
         assert functions.get_video_by_resolution(video, '720p') == 'path/to/720p.mp4'
@@ -243,9 +308,9 @@ class VideoTestCase(TestCase):
             description='desc',
             original_file=get_temp_video_file(),
             thumbnail=get_temp_image(),
-            video_180p=get_temp_video_file(),
             genre='comedy'
         )
+        add_renditions(video, 180)
         url = reverse('video-detail', kwargs={'pk': video.id})
         response = self.client.get(url, {'resolution': '180p'})
         assert response.status_code == status.HTTP_200_OK
@@ -300,3 +365,617 @@ class VideoTestCase(TestCase):
         data = {'video_id': 1, 'position_in_seconds': 50}
         response = self.client.post(url, data, format='json')
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_video_list_is_paginated_newest_first(self):
+        """
+        Test that the video list returns keyset-paginated pages, newest first,
+        and that following the `next` cursor yields the remaining videos without overlap.
+        """
+        titles = ['Erstes Video', 'Zweites Video', 'Drittes Video']
+        for title in titles:
+            Video.objects.create(
+                title=title,
+                description='Beschreibung',
+                original_file=get_temp_video_file(),
+                thumbnail=get_temp_image(),
+                genre='action'
+            )
+
+        url = reverse('video-list')
+        response = self.client.get(url, {'page_size': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert [v['title'] for v in response.data['results']] == ['Drittes Video', 'Zweites Video']
+        assert response.data['next'] is not None
+
+        response = self.client.get(response.data['next'])
+        assert response.status_code == status.HTTP_200_OK
+        assert [v['title'] for v in response.data['results']] == ['Erstes Video']
+        assert response.data['next'] is None
+
+    def test_video_list_invalid_cursor(self):
+        """
+        Test that a malformed cursor returns HTTP 404 Not Found.
+        """
+        url = reverse('video-list')
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_video_list_cursor_is_a_row_comparison(self):
+        """
+        Test that the next page is selected with a row comparison on
+        (upload_date, id), so the index scan starts at the cursor.
+        """
+        for index in range(2):
+            Video.objects.create(
+                title=f'Seite {index}', description='Beschreibung', original_file=get_temp_video_file())
+        response = self.client.get(reverse('video-list'), {'page_size': 1})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(response.data['next'])
+        assert len(response.data['results']) == 1
+        assert any(
+            '("videoflix_video"."upload_date", "videoflix_video"."id") < (' in query['sql'] for query in queries)
+
+    def test_video_list_cursor_with_wrong_typed_value(self):
+        """
+        Test that a well-formed cursor whose values do not fit the ordering
+        fields returns HTTP 404 Not Found instead of a server error.
+        """
+        cursor = base64.urlsafe_b64encode(json.dumps(['garbage', 1]).encode()).decode()
+        for name in ('video-list', 'video-search', 'continue-watching'):
+            response = self.client.get(reverse(name), {'cursor': cursor, 'q': 'video'})
+            assert response.status_code == status.HTTP_404_NOT_FOUND, name
+
+    def test_video_list_filters_by_genre(self):
+        """
+        Test that the video list can be restricted to a single genre and rejects unknown genres.
+        """
+        for title, genre in [('Action Video', 'action'), ('Drama Video', 'drama')]:
+            Video.objects.create(
+                title=title,
+                description='Beschreibung',
+                original_file=get_temp_video_file(),
+                genre=genre
+            )
+
+        url = reverse('video-list')
+        response = self.client.get(url, {'genre': 'drama'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [v['title'] for v in response.data['results']] == ['Drama Video']
+
+        response = self.client.get(url, {'genre': 'western'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_video_list_etag_and_invalidation(self):
+        """
+        Test that the video list answers 304 for a matching ETag and is rebuilt
+        after a video is saved.
+        """
+        url = reverse('video-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        assert response.data['results'] == []
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Video.objects.create(
+                title='Neues Video',
+                description='Beschreibung',
+                original_file=get_temp_video_file(),
+                genre='comedy'
+            )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert [v['title'] for v in response.data['results']] == ['Neues Video']
+
+    def test_video_search_ranks_title_matches_first(self):
+        """
+        Test that the search endpoint returns only matching videos, ranking title
+        matches above description matches, and follows pagination cursors.
+        """
+        Video.objects.create(
+            title='Ein Abend am Meer',
+            description='Ruhige Bilder',
+            original_file=get_temp_video_file(),
+            genre='drama'
+        )
+        Video.objects.create(
+            title='Unterwasserwelten',
+            description='Eine Reise durch das Meer',
+            original_file=get_temp_video_file(),
+            genre='documentary'
+        )
+        Video.objects.create(
+            title='Bergsteiger',
+            description='Gipfel und Gletscher',
+            original_file=get_temp_video_file(),
+            genre='documentary'
+        )
+
+        url = reverse('video-search')
+        response = self.client.get(url, {'q': 'meer', 'page_size': 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert [v['title'] for v in response.data['results']] == ['Ein Abend am Meer']
+
+        response = self.client.get(response.data['next'])
+        assert [v['title'] for v in response.data['results']] == ['Unterwasserwelten']
+        assert response.data['next'] is None
+
+    def test_video_search_requires_query(self):
+        """
+        Test that searching without a query returns HTTP 400 Bad Request.
+        """
+        response = self.client.get(reverse('video-search'))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_genre_rails_returns_newest_videos_per_genre_in_one_query(self):
+        """
+        Test that the rails endpoint returns the newest N videos of each genre,
+        ordered like GENRE_CHOICES, using a single database query.
+        """
+        for title, genre in [('Action 1', 'action'), ('Drama 1', 'drama'),
+                             ('Action 2', 'action'), ('Action 3', 'action')]:
+            Video.objects.create(
+                title=title,
+                description='Beschreibung',
+                original_file=get_temp_video_file(),
+                genre=genre
+            )
+
+        url = reverse('video-rails')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'per_genre': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert [rail['genre'] for rail in response.data] == ['action', 'drama']
+        assert [v['title'] for v in response.data[0]['videos']] == ['Action 3', 'Action 2']
+        assert [v['title'] for v in response.data[1]['videos']] == ['Drama 1']
+
+    def test_video_list_projection_is_byte_compatible_with_serializer(self):
+        """
+        Test that the serializer-free projection rendered with orjson produces
+        exactly the same bytes as VideoListSerializer rendered with DRF's JSONRenderer.
+        """
+        Video.objects.create(
+            title='Über\u2028Zeilen "Video"',
+            description='Beschreibung mit Ümlauten',
+            original_file=get_temp_video_file(),
+            thumbnail=get_temp_image(),
+            genre='sci-fi'
+        )
+        Video.objects.create(
+            title='Ohne Vorschaubild',
+            description='',
+            original_file=get_temp_video_file(),
+            genre='horror'
+        )
+        request = Request(APIRequestFactory().get('/api/video/videos/'))
+        videos = Video.objects.order_by('id')
+
+        expected = JSONRenderer().render(
+            VideoListSerializer(videos, many=True, context={'request': request}).data)
+        projection = VideoListProjection(request)
+        actual = ORJSONRenderer().render(projection.project(projection.values(videos)))
+        assert actual == expected
+
+    def test_video_detail_uses_one_query_and_caches_body(self):
+        """
+        Test that the video detail costs two queries (video plus renditions) on a
+        cache miss and one on a hit, and that the cached body is merged with the
+        user's current position.
+        """
+        video = Video.objects.create(
+            title='Cache Video',
+            description='Beschreibung',
+            original_file=get_temp_video_file(),
+            thumbnail=get_temp_image(),
+            genre='comedy'
+        )
+        add_renditions(video, 360, 720)
+        VideoProgress.objects.create(
+            user=self.user, video=video, position_in_seconds=12.0)
+        url = reverse('video-detail', kwargs={'pk': video.id})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['resolution'] == '720p'
+        assert response.data['video_180p'] is None
+        assert response.data['video_url'] == response.data['video_720p']
+        assert response.data['last_position'] == 12.0
+
+        VideoProgress.objects.filter(user=self.user, video=video).update(position_in_seconds=30.0)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'resolution': '360p'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['video_url'] == response.data['video_360p']
+        assert 'video_720p' not in response.data
+        assert response.data['last_position'] == 30.0
+
+    def test_video_stream_serves_rendition_with_stored_size(self):
+        """
+        Test that streaming uses the rendition's stored size and content type,
+        supports range requests and returns 404 for a missing resolution.
+        """
+        video = Video.objects.create(
+            title='Stream Video',
+            description='Beschreibung',
+            original_file=get_temp_video_file(),
+            genre='action'
+        )
+        rendition = Rendition.objects.create(
+            video=video, height=360, byte_size=18, file=get_temp_video_file())
+        filename = rendition.file.name.rsplit('/', 1)[-1]
+        url = reverse('video-stream', args=[video.id, '360p', filename])
+
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'video/mp4'
+        assert response['Content-Length'] == '18'
+        assert b''.join(response.streaming_content) == b'fake video content'
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-3')
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response['Content-Range'] == 'bytes 0-3/18'
+        assert response.content == b'fake'
+
+        response = self.client.get(reverse('video-stream', args=[video.id, '720p', filename]))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_buffered_progress_is_visible_before_flush_and_upserted(self):
+        """
+        Test that buffered progress is returned by detail and continue-watching
+        before the flush, and that the flush updates existing rows in place.
+        """
+        video = Video.objects.create(
+            title='Puffer Video',
+            description='Beschreibung',
+            original_file=get_temp_video_file(),
+            thumbnail=get_temp_image(),
+            genre='drama'
+        )
+        add_renditions(video, 720)
+        VideoProgress.objects.create(user=self.user, video=video, position_in_seconds=10.0)
+
+        response = self.client.post(
+            reverse('video-progress'), {'video_id': video.id, 'position_in_seconds': 42.0}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+        response = self.client.get(reverse('video-detail', kwargs={'pk': video.id}))
+        assert response.data['last_position'] == 42.0
+        response = self.client.get(reverse('continue-watching'))
+        assert [(v['id'], v['position_in_seconds']) for v in response.data['results']] == [(video.id, 42.0)]
+        assert VideoProgress.objects.get(user=self.user, video=video).position_in_seconds == 10.0
+
+        with self.assertNumQueries(4):
+            assert progress.flush_buffered_progress() == 1
+        assert VideoProgress.objects.get(user=self.user, video=video).position_in_seconds == 42.0
+        assert VideoProgress.objects.filter(user=self.user).count() == 1
+        assert progress.flush_buffered_progress() == 0
+
+    def test_watch_stats_rows_are_locked_in_video_order(self):
+        """
+        Test that the rollup rows are locked ordered by video, so concurrent
+        jobs cannot deadlock on overlapping videos.
+        """
+        videos = [
+            Video.objects.create(title=f'Lock {i}', description='d', original_file=get_temp_video_file(),
+                                 genre='drama', duration=100.0)
+            for i in range(2)
+        ]
+        events = [[video.id, None, 10.0, 10.0, True, True, True] for video in reversed(videos)]
+        with CaptureQueriesContext(connection) as queries:
+            analytics.apply_watch_events(events, timezone.localdate().isoformat())
+        locking = [query['sql'] for query in queries if 'FOR UPDATE' in query['sql']]
+        assert len(locking) == 2
+        assert all('ORDER BY' in sql for sql in locking)
+
+    def test_concurrent_flush_does_not_process_updates_twice(self):
+        """
+        Test that a flush job finding another flush running leaves the updates
+        to it, so watch events are not counted twice.
+        """
+        video = Video.objects.create(
+            title='Sperre', description='Beschreibung', original_file=get_temp_video_file(), genre='drama')
+        progress.record_progress(self.user.id, video.id, 42.0)
+        redis = progress._redis()
+        running = redis.lock(progress.FLUSH_LOCK_KEY, timeout=60)
+        assert running.acquire(blocking=False)
+
+        with patch('videoflix.api.progress.enqueue_watch_events') as enqueue:
+            assert progress.flush_buffered_progress() == 0
+            assert progress.has_pending_progress()
+            running.release()
+            assert progress.flush_buffered_progress() == 1
+        assert enqueue.call_count == 1
+        assert not redis.exists(progress.FLUSH_LOCK_KEY)
+
+    def test_progress_batch_applies_last_write_wins_in_one_upsert(self):
+        """
+        Test that the batch endpoint keeps the newest update per video, ignores
+        updates older than the stored position, reports unknown videos and
+        writes everything with one validation query, one lookup and one upsert.
+        """
+        first = Video.objects.create(
+            title='Batch 1', description='Beschreibung', original_file=get_temp_video_file(), genre='drama')
+        second = Video.objects.create(
+            title='Batch 2', description='Beschreibung', original_file=get_temp_video_file(), genre='drama')
+        add_renditions(first, 720)
+        VideoProgress.objects.create(
+            user=self.user, video=second, position_in_seconds=99.0,
+            client_updated_at='2026-01-01T12:00:00Z')
+
+        updates = [
+            {'video_id': first.id, 'position_in_seconds': 30.0, 'client_timestamp': '2026-01-01T10:00:05Z'},
+            {'video_id': first.id, 'position_in_seconds': 20.0, 'client_timestamp': '2026-01-01T10:00:00Z'},
+            {'video_id': second.id, 'position_in_seconds': 5.0, 'client_timestamp': '2026-01-01T11:00:00Z'},
+            {'video_id': 999999, 'position_in_seconds': 1.0, 'client_timestamp': '2026-01-01T10:00:00Z'},
+        ]
+        url = reverse('video-progress-batch')
+        with self.assertNumQueries(3):
+            response = self.client.post(url, {'updates': updates}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'applied': 1, 'stale': 1, 'unknown_videos': [999999]}
+        assert VideoProgress.objects.get(user=self.user, video=first).position_in_seconds == 30.0
+        assert VideoProgress.objects.get(user=self.user, video=second).position_in_seconds == 99.0
+
+        response = self.client.get(reverse('video-detail', kwargs={'pk': first.id}))
+        assert response.data['last_position'] == 30.0
+
+        response = self.client.post(url, {'updates': []}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_record_progress_throttles_and_coalesces_small_moves(self):
+        """
+        Test that heartbeats within the throttle interval are dropped, small moves
+        only refresh the read buffer, and large moves, elapsed windows and pauses
+        are queued for the database, with the suppression ratio reported.
+        """
+        video = Video.objects.create(
+            title='Coalesce', description='Beschreibung', original_file=get_temp_video_file(), genre='drama')
+        record = progress.record_progress
+        start = 1_000_000.0
+
+        assert record(self.user.id, video.id, 10.0, timestamp=start) == 'persisted'
+        assert record(self.user.id, video.id, 10.5, timestamp=start + 0.5) == 'throttled'
+        assert record(self.user.id, video.id, 12.0, timestamp=start + 2) == 'coalesced'
+        assert progress.get_buffered_positions(self.user.id) == {video.id: 12.0}
+        assert record(self.user.id, video.id, 13.0, timestamp=start + 3, state='paused') == 'persisted'
+        assert record(self.user.id, video.id, 20.0, timestamp=start + 5) == 'persisted'
+        assert record(self.user.id, video.id, 21.0, timestamp=start + 40) == 'persisted'
+
+        stats = progress.get_progress_write_stats()
+        assert stats['received'] == 6
+        assert stats['persisted'] == 4
+        assert stats['suppression_ratio'] == 2 / 6
+
+        progress.flush_buffered_progress()
+        assert VideoProgress.objects.get(user=self.user, video=video).position_in_seconds == 21.0
+
+    def test_continue_watching_is_ordered_paginated_and_skips_finished(self):
+        """
+        Test that continue-watching lists started, unfinished videos most recently
+        watched first, pages with a cursor and excludes finished videos.
+        """
+        videos = [
+            Video.objects.create(
+                title=f'Weiter {index}', description='Beschreibung', original_file=get_temp_video_file(),
+                thumbnail=get_temp_image(), genre='drama', duration=100.0)
+            for index in range(4)
+        ]
+        VideoProgress.objects.create(user=self.user, video=videos[0], position_in_seconds=10.0)
+        VideoProgress.objects.create(user=self.user, video=videos[1], position_in_seconds=0.0)
+        VideoProgress.objects.create(user=self.user, video=videos[2], position_in_seconds=99.0)
+        VideoProgress.objects.create(user=self.user, video=videos[3], position_in_seconds=50.0)
+        VideoProgress.objects.filter(video=videos[0]).update(updated_at='2026-01-02T00:00:00Z')
+        VideoProgress.objects.filter(video=videos[3]).update(updated_at='2026-01-01T00:00:00Z')
+
+        url = reverse('continue-watching')
+        response = self.client.get(url, {'page_size': 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert [v['id'] for v in response.data['results']] == [videos[0].id]
+        assert response.data['results'][0]['img'].startswith('http://testserver/media/')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(response.data['next'])
+        assert [v['id'] for v in response.data['results']] == [videos[3].id]
+        assert response.data['next'] is None
+        # Matches the (user, updated_at, id) prefix of progress_user_recent_idx.
+        assert any(
+            '("videoflix_videoprogress"."updated_at", "videoflix_videoprogress"."id") < (' in query['sql']
+            for query in queries)
+
+    def test_progress_writes_feed_watch_stats_rollups(self):
+        """
+        Test that flushed progress produces watch events which update the per-video
+        and per-day rollups, and that admins can read them from the stats endpoint.
+        """
+        video = Video.objects.create(
+            title='Statistik', description='Beschreibung', original_file=get_temp_video_file(),
+            genre='drama', duration=100.0)
+
+        with patch('videoflix.api.tasks.update_watch_stats.delay') as delay:
+            progress.record_progress(self.user.id, video.id, 15.0, timestamp=1_000_000.0)
+            progress.flush_buffered_progress()
+            progress.record_progress(self.user.id, video.id, 55.0, timestamp=1_000_030.0)
+            progress.flush_buffered_progress()
+        for call in delay.call_args_list:
+            analytics.apply_watch_events(*call.args)
+
+        stats = VideoStats.objects.get(video=video)
+        assert stats.views == 1
+        assert stats.unique_viewers == 1
+        assert stats.seconds_watched == 15.0 + 40.0
+        assert stats.completion_histogram == [0, 0, 0, 0, 0, 1, 0, 0, 0, 0]
+        daily = VideoDailyStats.objects.get(video=video)
+        assert (daily.views, daily.unique_viewers, daily.seconds_watched) == (1, 1, 55.0)
+
+        url = reverse('video-stats', kwargs={'pk': video.id})
+        assert self.client.get(url).status_code == status.HTTP_403_FORBIDDEN
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url, {'days': 7})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['totals']['views'] == 1
+        assert [day['seconds_watched'] for day in response.data['daily']] == [55.0]
+
+
+class RQSupervisorTestCase(TestCase):
+    """
+    Tests for the scaling decisions of the `rqsupervisor` command.
+    """
+
+    def test_worker_count_follows_backlog_and_wait_within_bounds(self):
+        bounds = {'min_workers': 1, 'max_workers': 4, 'backlog': 2, 'max_wait': 60}
+        self.assertEqual(desired_worker_count(3, 0, 0.0, **bounds), 1)
+        self.assertEqual(desired_worker_count(1, 5, 10.0, **bounds), 3)
+        self.assertEqual(desired_worker_count(1, 1, 120.0, **bounds), 2)
+        self.assertEqual(desired_worker_count(4, 1, 120.0, **bounds), 4)
+        self.assertEqual(desired_worker_count(1, 50, 0.0, **bounds), 4)
+
+    def test_queue_load_reports_depth_and_oldest_job_age(self):
+        with patch('videoflix.management.commands.rqsupervisor.django_rq.get_queue') as get_queue:
+            queue = get_queue.return_value
+            queue.count = 3
+            queue.get_job_ids.return_value = ['job']
+            queue.fetch_job.return_value.enqueued_at = timezone.now() - timedelta(seconds=90)
+            depth, oldest_age = queue_load(['default'])
+        self.assertEqual(depth, 3)
+        self.assertAlmostEqual(oldest_age, 90, delta=5)
+
+    def test_mail_pool_spawns_non_forking_workers(self):
+        command = Command()
+        command.options = {'worker_class': None, **settings.RQ_WORKER_POOLS['mail']}
+        command.workers, command.sequence, command.prefix = {}, 0, 'test'
+        with patch('videoflix.management.commands.rqsupervisor.subprocess.Popen') as popen:
+            command.spawn()
+        args = popen.call_args.args[0]
+        self.assertEqual(args[2:4], ['rqworker', 'mail'])
+        self.assertEqual(args[args.index('--worker-class') + 1], 'core.metrics.MetricsSimpleWorker')
+        self.assertIn('--with-scheduler', args)
+        self.assertNotIn('mail', settings.RQ_WORKER_POOLS['light']['queues'])
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0.0, PROFILING_INTERVAL=0.001)
+class ProfilingTestCase(TestCase):
+    """
+    Tests for the opt-in request profiling middleware.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # A new client builds its middleware chain with the overridden settings.
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='profiler@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def test_requests_without_token_are_not_profiled(self):
+        response = self.client.get(reverse('video-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', response)
+
+        response = self.client.get(reverse('video-list'), HTTP_X_PROFILE='forged')
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_token_profiles_request_and_staff_downloads_folded_stacks(self):
+        Video.objects.create(title='Profiled', description='d', original_file=get_temp_video_file())
+        response = self.client.get(reverse('video-list'), HTTP_X_PROFILE=make_profile_token())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response['X-Profile-Id']
+
+        profile = get_profile(profile_id)
+        self.assertEqual(profile['path'], reverse('video-list'))
+        self.assertEqual(profile['status'], 200)
+        self.assertEqual(profile['query_count'], len(profile['queries']))
+        self.assertTrue(profile['queries'])
+
+        folded_url = reverse('profile-folded', args=[profile_id])
+        self.assertEqual(self.client.get(folded_url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(folded_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(self.client.get(reverse('profile-list')).data[0]['id'], profile_id)
+
+    # Alone in the chain the middleware runs as a coroutine.
+    @override_settings(MIDDLEWARE=['core.profiling.ProfilingMiddleware'])
+    async def test_profiling_under_asgi_samples_the_request_thread(self):
+        self.user.is_active = True
+        await self.user.asave()
+        token = await sync_to_async(AuthToken.objects.issue)(self.user)
+        response = await AsyncClient().get(reverse('video-list'), headers={
+            'X-Profile': make_profile_token(), 'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        profile = await sync_to_async(get_profile)(response['X-Profile-Id'])
+        self.assertTrue(profile['queries'])
+        self.assertTrue(any('rest_framework.views' in stack for stack in profile['stacks']))
+
+
+class MetricsTestCase(TestCase):
+    """
+    Tests for the Prometheus metrics endpoint and its collectors.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='metrics@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def scrape(self, **headers):
+        response = APIClient().get(reverse('metrics'), **headers)
+        return response, response.content.decode()
+
+    def test_requests_queries_cache_and_queues_are_exported(self):
+        url = reverse('video-list')
+        self.client.get(url)
+        self.client.get(url)
+
+        response, text = self.scrape()
+        route = url.lstrip('/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(f'http_request_duration_seconds_count{{method="GET",route="{route}",status="200"}}', text)
+        self.assertIn(f'django_db_queries_per_request_count{{route="{route}"}}', text)
+        self.assertIn('django_cache_requests_total{keyspace="catalog:video-list",result="hit"}', text)
+        self.assertIn('rq_queue_jobs{queue="transcode-bulk",state="queued"}', text)
+        self.assertIn('videoflix_progress_updates_total{outcome="received"}', text)
+
+    # Alone in the chain the middleware runs as a coroutine.
+    @override_settings(MIDDLEWARE=['core.metrics.MetricsMiddleware'])
+    async def test_queries_are_counted_under_asgi(self):
+        url = reverse('video-list')
+        route = url.lstrip('/')
+        before = DB_QUERIES.labels(route)._sum.get()
+        self.user.is_active = True
+        await self.user.asave()
+        token = await sync_to_async(AuthToken.objects.issue)(self.user)
+        response = await AsyncClient().get(url, headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(DB_QUERIES.labels(route)._sum.get(), before)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.scrape()[0].status_code, status.HTTP_403_FORBIDDEN)
+        response, _ = self.scrape(HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_finished_job_reports_duration_and_transcode_time(self):
+        job = type('Job', (), {})()
+        job.func_name = 'videoflix.api.tasks.transcode_rendition'
+        job.started_at = timezone.now() - timedelta(seconds=42)
+        job.ended_at = timezone.now()
+        job.get_status = lambda refresh=True: 'finished'
+        job.meta = {'metrics': [['transcode_seconds', 40.0, {'rendition': '720p'}]]}
+        before = TRANSCODE_SECONDS.labels('720p')._sum.get()
+
+        observe_job(job, 'transcode-bulk')
+
+        self.assertEqual(TRANSCODE_SECONDS.labels('720p')._sum.get() - before, 40.0)
+        _, text = self.scrape()
+        self.assertIn('rq_job_duration_seconds_count{queue="transcode-bulk",status="finished",'
+                      'task="videoflix.api.tasks.transcode_rendition"}', text)